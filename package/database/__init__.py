@@ -1,6 +1,9 @@
 """
     Entry point for the RegionDatabase.
 """
-from ._region_database import RegionDatabase
+from ._region_database import RegionDatabase, RegionMapping
+from ._migration import migrateDatabase
+from ._export import exportDatabase, iterateExport
+from ._snapshot import RegionSnapshot, compileSnapshot
 from .entities import *
 
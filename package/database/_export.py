@@ -0,0 +1,211 @@
+""" Streams the series of a region database to files that can be shared without the database.
+	Rows are read from the sqlite file in batches, so memory use does not depend on the size
+	of the database. Two formats are supported:
+	* 'ndjson': One json object per series, with its metadata and values. Compressed with gzip if
+		the filename ends in '.gz'.
+	* 'npz': A long-format table with one row per value and the columns 'region', 'report', 'code',
+		'year' and 'value'. Each batch is saved as a separate set of arrays, named 'region.0',
+		'year.0', etc. Use iterateExport() to read it back one batch at a time.
+	In both formats years are integers: values saved for a date within a year are given the year
+	of that date, as with Series.arrays.
+"""
+import gzip
+import json
+import os
+import sqlite3
+import time
+import urllib.request
+import zipfile
+
+import numpy
+
+from ..utilities import encoding
+from ._region_database import standard_datasets
+
+EXPORT_FORMATS = ['ndjson', 'npz']
+EXPORT_COLUMNS = ['region', 'report', 'code', 'year', 'value']
+
+
+def _connect(filename):
+	""" Opens the database read-only, so the export never blocks or modifies it. """
+	uri = 'file:{}?mode=ro'.format(urllib.request.pathname2url(os.path.abspath(filename)))
+	return sqlite3.connect(uri, uri = True)
+
+
+def _hasTable(connection, table):
+	""" Checks whether a table exists, ex. one added by migrateDatabase(). """
+	query = 'SELECT 1 FROM "sqlite_master" WHERE "type" = \'table\' AND "name" = ?'
+	return connection.execute(query, (table,)).fetchone() is not None
+
+
+def _getColumns(connection, table):
+	""" Returns the names of the columns of a table, ex. to check for columns added by migrateDatabase(). """
+	return {i[1] for i in connection.execute('PRAGMA table_info("{}")'.format(table))}
+
+
+def _getValueColumns(connection):
+	""" Returns the sql selecting the 'binvalues' and 'strvalues' columns of the series table.
+		Databases that have not been migrated have no 'binvalues' column, so NULL is selected in its
+		place and the values are decoded from 'strvalues'.
+	"""
+	if 'binvalues' in _getColumns(connection, 'Series'):
+		return 's."binvalues", s."strvalues"'
+	return 'NULL, s."strvalues"'
+
+
+def _iterateRows(connection, report, batch_size):
+	""" Yields the series of the database in batches of `batch_size` rows.
+		The name of a series is only saved with the series if it differs from its definition.
+		Databases that have not been migrated have no series definitions, so the name saved with
+		each series is used.
+	"""
+	value_columns = _getValueColumns(connection)
+	if _hasTable(connection, 'SeriesDefinition'):
+		query = """SELECT s."region", s."report", s."code", COALESCE(NULLIF(s."name", ''), d."name"), s."units", s."scale", {}
+			FROM "Series" s LEFT JOIN "SeriesDefinition" d ON d."report" = s."report" AND d."code" = s."code\"""".format(value_columns)
+	else:
+		query = """SELECT s."region", s."report", s."code", s."name", s."units", s."scale", {}
+			FROM "Series" s""".format(value_columns)
+	parameters = tuple()
+	if report is not None:
+		query += ' WHERE s."report" = ?'
+		parameters = (report,)
+
+	cursor = connection.execute(query, parameters)
+	while True:
+		rows = cursor.fetchmany(batch_size)
+		if len(rows) == 0:
+			break
+		yield rows
+
+
+def _writeJson(file1, rows, offsets, years, values):
+	""" Writes one line per series. NaN values are written as null. """
+	for index, (region, report, code, name, units, scale, _, _) in enumerate(rows):
+		start, end = offsets[index], offsets[index + 1]
+		series_values = [
+			[year, None if value != value else value]
+			for year, value in zip(years[start:end].tolist(), values[start:end].tolist())
+		]
+		data = {
+			'region': region,
+			'report': report,
+			'code':   code,
+			'name':   name,
+			'units':  units,
+			'scale':  scale,
+			'values': series_values
+		}
+		file1.write(json.dumps(data) + '\n')
+
+
+def _writeArrays(archive, chunk, rows, offsets, years, values):
+	""" Adds one batch of the long-format table to the archive. NaN values are skipped. """
+	counts = numpy.diff(offsets)
+	columns = {
+		'region': numpy.repeat(numpy.array([i[0] for i in rows], dtype = str), counts),
+		'report': numpy.repeat(numpy.array([i[1] for i in rows], dtype = str), counts),
+		'code':   numpy.repeat(numpy.array([i[2] for i in rows], dtype = str), counts),
+		'year':   years,
+		'value':  values
+	}
+	is_valid = ~numpy.isnan(values)
+	for column in EXPORT_COLUMNS:
+		with archive.open('{}.{}.npy'.format(column, chunk), 'w', force_zip64 = True) as file1:
+			numpy.lib.format.write_array(file1, columns[column][is_valid], allow_pickle = False)
+	return int(is_valid.sum())
+
+
+def exportDatabase(filename, output, report = None, export_format = None, batch_size = 10000):
+	""" Exports every series in a database, or in a single report.
+		Parameters
+		----------
+		filename: str
+			Path to the sqlite file or the name of a standard dataset ('global', 'europe', 'test').
+		output: str
+			The file to write.
+		report: str; default None
+			The name of the report to export. Exports every report if not given.
+		export_format: {'ndjson', 'npz'}; default None
+			Inferred from the extension of `output` if not given. See the module docstring.
+		batch_size: int; default 10000
+			The number of series read and written at a time.
+		Returns
+		-------
+		dict<>
+			* 'series': int
+			* 'points': int
+				The number of values written.
+			* 'seconds': float
+	"""
+	filename = standard_datasets.get(filename, filename)
+	if not os.path.exists(filename):
+		message = "'{}' does not exist.".format(filename)
+		raise FileNotFoundError(message)
+
+	if export_format is None:
+		export_format = 'npz' if output.endswith('.npz') else 'ndjson'
+	if export_format not in EXPORT_FORMATS:
+		message = "'{}' is not a valid export format. Expected one of {}".format(export_format, EXPORT_FORMATS)
+		raise ValueError(message)
+
+	if export_format == 'npz':
+		file1 = zipfile.ZipFile(output, 'w', compression = zipfile.ZIP_DEFLATED, allowZip64 = True)
+	elif output.endswith('.gz'):
+		file1 = gzip.open(output, 'wt', encoding = 'utf-8')
+	else:
+		file1 = open(output, 'w', encoding = 'utf-8')
+
+	connection = _connect(filename)
+	series_written = 0
+	points_written = 0
+	start = time.perf_counter()
+	try:
+		for chunk, rows in enumerate(_iterateRows(connection, report, batch_size)):
+			offsets, years, values = encoding.decodeValues([(i[6], i[7]) for i in rows])
+			if export_format == 'npz':
+				points_written += _writeArrays(file1, chunk, rows, offsets, years, values)
+			else:
+				_writeJson(file1, rows, offsets, years, values)
+				points_written += len(values)
+			series_written += len(rows)
+			print("Exported {} series ({} values)".format(series_written, points_written), flush = True)
+	finally:
+		connection.close()
+		file1.close()
+
+	elapsed = time.perf_counter() - start
+	print("Exported {} series to {} in {:.1f} seconds.".format(series_written, output, elapsed))
+	result = {
+		'series':  series_written,
+		'points':  points_written,
+		'seconds': elapsed
+	}
+	return result
+
+
+def iterateExport(filename):
+	""" Reads a file written by exportDatabase(export_format = 'npz') one batch at a time.
+		Yields
+		------
+		dict<str, numpy.ndarray>
+			The 'region', 'report', 'code', 'year' and 'value' columns of the batch.
+	"""
+	with numpy.load(filename) as archive:
+		chunks = sorted({int(i.rsplit('.', 1)[1]) for i in archive.files})
+		for chunk in chunks:
+			yield {column: archive['{}.{}'.format(column, chunk)] for column in EXPORT_COLUMNS}
+
+
+if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description = "Exports the series of a region database.")
+	parser.add_argument('filename')
+	parser.add_argument('output')
+	parser.add_argument('--report', default = None)
+	parser.add_argument('--format', dest = 'export_format', choices = EXPORT_FORMATS, default = None)
+	parser.add_argument('--batch-size', type = int, default = 10000)
+	arguments = parser.parse_args()
+
+	exportDatabase(arguments.filename, arguments.output, arguments.report, arguments.export_format, arguments.batch_size)
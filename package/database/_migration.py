@@ -0,0 +1,273 @@
+""" Converts existing region databases to the current storage format.
+	The conversion works directly on the sqlite file so that databases which can no
+	longer be mapped by pony (ex. missing the 'binvalues' column) can still be opened.
+	The values of each series are converted to 'binvalues' and their summary statistics
+	(see encoding.summarizeValues()) are calculated in the same pass. The name, description and notes
+	repeated for every region are then moved to the series definition table, and the search
+	index is rebuilt.
+"""
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ..utilities import encoding
+from ._region_database import standard_datasets, SEARCH_TABLE, SEARCH_SCHEMA, SEARCH_POPULATE_QUERIES
+
+SERIES_TABLE = 'Series'
+DEFINITION_TABLE = 'SeriesDefinition'
+CHECKPOINT_TABLE = 'MigrationCheckpoint'
+MIGRATION_NAME = 'summary'
+
+# Columns added to the series table since the original schema.
+SERIES_COLUMNS = [
+	('binvalues', 'BLOB'),
+	('firstyear', 'INTEGER'),
+	('lastyear', 'INTEGER'),
+	('points', 'INTEGER'),
+	('minimum', 'REAL'),
+	('maximum', 'REAL'),
+	('latest', 'REAL'),
+	('checksum', 'TEXT')
+]
+# Indexes on the added columns. Named the same way pony names the indexes it creates.
+SERIES_INDEXES = [
+	('firstyear',), ('lastyear',), ('minimum',), ('maximum',), ('latest',), ('checksum',),
+	('report', 'code', 'firstyear', 'lastyear')
+]
+# The text shared by the series of every region. Matches the SeriesDefinition entity.
+DEFINITION_COLUMNS = ['name', 'description', 'notes']
+DEFINITION_SCHEMA = """CREATE TABLE IF NOT EXISTS "{}" (
+  "report" TEXT NOT NULL REFERENCES "Report" ("name") ON DELETE CASCADE,
+  "code" TEXT NOT NULL,
+  "name" TEXT NOT NULL,
+  "description" TEXT NOT NULL,
+  "notes" TEXT NOT NULL,
+  PRIMARY KEY ("report", "code")
+)""".format(DEFINITION_TABLE)
+
+
+def _encodeStringValues(string):
+	""" Converts a 'strvalues' string into the binary format.
+		Returns None if the string cannot be represented as binary values.
+	"""
+	try:
+		values = [i.split(encoding.XY_SEPARATOR) for i in string.split(encoding.POINT_SEPARATOR)]
+		values = [(i, float(j)) for i, j in values]
+	except ValueError:
+		return None
+	return encoding.packValues(values)
+
+
+def _summarizeRow(string, binvalues):
+	if binvalues:
+		years, values = encoding.unpackValues(binvalues)
+	else:
+		try:
+			_, years, values = encoding.decodeStringValues([string])
+		except ValueError:
+			return dict.fromkeys(encoding.SUMMARY_KEYS)
+	return encoding.summarizeValues(years, values)
+
+
+def _encodeRows(rows):
+	""" Encodes a batch of (rowid, strvalues, binvalues) rows. Runs inside the worker processes.
+		Returns
+		-------
+		encoded_rows, converted: list<tuple>, int
+			The binvalues, strvalues, summary statistics and rowid of each row, and the number of
+			rows that were converted from 'strvalues' to 'binvalues'.
+	"""
+	encoded_rows = list()
+	converted = 0
+	for rowid, string, binvalues in rows:
+		if string:
+			encoded_values = _encodeStringValues(string)
+			if encoded_values is not None:
+				binvalues, string = encoded_values, ''
+				converted += 1
+		summary = _summarizeRow(string, binvalues)
+		encoded_rows.append((binvalues, string) + tuple(summary[i] for i in encoding.SUMMARY_KEYS) + (rowid,))
+	return encoded_rows, converted
+
+
+def _upgradeSchema(connection):
+	""" Adds any missing series columns, their indexes, the definition table and the checkpoint table. """
+	existing_columns = {i[1] for i in connection.execute('PRAGMA table_info("{}")'.format(SERIES_TABLE))}
+	with connection:
+		for column, column_type in SERIES_COLUMNS:
+			if column not in existing_columns:
+				connection.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(SERIES_TABLE, column, column_type))
+		for columns in SERIES_INDEXES:
+			connection.execute('CREATE INDEX IF NOT EXISTS "idx_{0}__{1}" ON "{2}" ({3})'.format(
+				SERIES_TABLE.lower(), '_'.join(columns).lower(), SERIES_TABLE, ', '.join('"{}"'.format(i) for i in columns)
+			))
+		connection.execute(DEFINITION_SCHEMA)
+		connection.execute(
+			'CREATE TABLE IF NOT EXISTS "{}" ("name" TEXT NOT NULL PRIMARY KEY, "position" INTEGER NOT NULL)'.format(
+				CHECKPOINT_TABLE
+			)
+		)
+
+
+def _addSeriesDefinitions(connection):
+	""" Creates the definition of each (report, code) pair from its first series, then clears
+		the name, description and notes of every series that matches its definition.
+		Returns
+		-------
+		int
+			The number of definitions created.
+	"""
+	insert_query = """INSERT OR IGNORE INTO "{0}" ("report", "code", "name", "description", "notes")
+		SELECT s."report", s."code", s."name", s."description", s."notes" FROM "{1}" s
+		WHERE s.rowid IN (SELECT MIN(rowid) FROM "{1}" GROUP BY "report", "code")""".format(DEFINITION_TABLE, SERIES_TABLE)
+	update_query = """UPDATE "{1}" SET "{2}" = '' WHERE "{2}" != '' AND "{2}" = (
+		SELECT d."{2}" FROM "{0}" d WHERE d."report" = "{1}"."report" AND d."code" = "{1}"."code")"""
+
+	with connection:
+		definitions = connection.execute(insert_query).rowcount
+		for column in DEFINITION_COLUMNS:
+			connection.execute(update_query.format(DEFINITION_TABLE, SERIES_TABLE, column))
+	return definitions
+
+
+def _rebuildSearchIndex(connection):
+	""" Recreates the full-text index used by RegionDatabase.search(). """
+	with connection:
+		connection.execute('DROP TABLE IF EXISTS "{}"'.format(SEARCH_TABLE))
+		connection.execute(SEARCH_SCHEMA)
+		for query in SEARCH_POPULATE_QUERIES:
+			connection.execute(query)
+
+
+def _getCheckpoint(connection, name):
+	row = connection.execute('SELECT "position" FROM "{}" WHERE "name" = ?'.format(CHECKPOINT_TABLE), (name,)).fetchone()
+	return row[0] if row else 0
+
+
+def _clearCheckpoint(connection, name):
+	with connection:
+		connection.execute('DELETE FROM "{}" WHERE "name" = ?'.format(CHECKPOINT_TABLE), (name,))
+
+
+def _readChunk(connection, position, chunksize):
+	query = 'SELECT rowid, "strvalues", "binvalues" FROM "{}" WHERE rowid > ? ORDER BY rowid LIMIT ?'.format(SERIES_TABLE)
+	return connection.execute(query, (position, chunksize)).fetchall()
+
+
+def migrateDatabase(filename, chunksize = 20000, processes = None, vacuum = False):
+	""" Converts the 'strvalues' of every series in a database to 'binvalues' and saves the
+		summary statistics of every series. The shared text of each series is then moved to
+		its definition. See _addSeriesDefinitions().
+		Rows are read and written in chunks so memory use does not depend on the size of the
+		database. Each chunk is committed together with a checkpoint, so an interrupted
+		migration resumes from the last committed chunk. The checkpoint is removed once the
+		migration has finished.
+		Parameters
+		----------
+		filename: str
+			Path to the sqlite file or the name of a standard dataset ('global', 'europe', 'test').
+		chunksize: int; default 20000
+			The number of rows read and committed at a time.
+		processes: int; default None
+			The number of worker processes used to encode the values. Defaults to the number of cpus.
+			If 1, values are encoded in the current process.
+		vacuum: bool; default False
+			Whether to rebuild the file afterwards to reclaim the space used by the old text values.
+		Returns
+		-------
+		dict<>
+			* 'rows': int
+				The number of rows read.
+			* 'converted': int
+				The number of rows that were converted to the binary format.
+			* 'definitions': int
+				The number of series definitions created.
+			* 'seconds': float
+	"""
+	filename = standard_datasets.get(filename, filename)
+	if not os.path.exists(filename):
+		message = "'{}' does not exist.".format(filename)
+		raise FileNotFoundError(message)
+
+	connection = sqlite3.connect(filename)
+	_upgradeSchema(connection)
+
+	position = _getCheckpoint(connection, MIGRATION_NAME)
+	total = connection.execute('SELECT COUNT(*) FROM "{}" WHERE rowid > ?'.format(SERIES_TABLE), (position,)).fetchone()[0]
+	if position:
+		print("Resuming the migration after row {}...".format(position))
+	print("Converting {} series in {}".format(total, filename))
+
+	update_columns = ['binvalues', 'strvalues'] + encoding.SUMMARY_KEYS
+	update_query = 'UPDATE "{}" SET {} WHERE rowid = ?'.format(
+		SERIES_TABLE, ', '.join('"{}" = ?'.format(i) for i in update_columns)
+	)
+	checkpoint_query = 'INSERT OR REPLACE INTO "{}" ("name", "position") VALUES (?, ?)'.format(CHECKPOINT_TABLE)
+
+	processes = processes or os.cpu_count() or 1
+	executor = ProcessPoolExecutor(processes) if processes > 1 else None
+	batchsize = max(1, chunksize // (processes * 4))
+
+	rows_read = 0
+	rows_converted = 0
+	start = time.perf_counter()
+	try:
+		while True:
+			chunk = _readChunk(connection, position, chunksize)
+			if len(chunk) == 0:
+				break
+
+			batches = [chunk[i:i + batchsize] for i in range(0, len(chunk), batchsize)]
+			if executor is None:
+				encoded_batches = map(_encodeRows, batches)
+			else:
+				encoded_batches = executor.map(_encodeRows, batches)
+
+			position = chunk[-1][0]
+			with connection:
+				for encoded_rows, converted in encoded_batches:
+					connection.executemany(update_query, encoded_rows)
+					rows_converted += converted
+				connection.execute(checkpoint_query, (MIGRATION_NAME, position))
+
+			rows_read += len(chunk)
+			elapsed = time.perf_counter() - start
+			print("{} of {} rows ({:.0f} rows/s)".format(rows_read, total, rows_read / elapsed), flush = True)
+	finally:
+		if executor is not None:
+			executor.shutdown()
+
+	print("Moving shared series text to {}...".format(DEFINITION_TABLE))
+	definitions = _addSeriesDefinitions(connection)
+	print("Rebuilding the search index...")
+	_rebuildSearchIndex(connection)
+	_clearCheckpoint(connection, MIGRATION_NAME)
+
+	if vacuum:
+		print("Reclaiming unused space...")
+		connection.execute('VACUUM')
+	connection.close()
+
+	elapsed = time.perf_counter() - start
+	print("Converted {} of {} series in {:.1f} seconds.".format(rows_converted, rows_read, elapsed))
+	result = {
+		'rows':        rows_read,
+		'converted':   rows_converted,
+		'definitions': definitions,
+		'seconds':     elapsed
+	}
+	return result
+
+
+if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description = "Converts a region database to the binary value format.")
+	parser.add_argument('filename')
+	parser.add_argument('--chunksize', type = int, default = 20000)
+	parser.add_argument('--processes', type = int, default = None)
+	parser.add_argument('--vacuum', action = 'store_true')
+	arguments = parser.parse_args()
+
+	migrateDatabase(arguments.filename, arguments.chunksize, arguments.processes, arguments.vacuum)
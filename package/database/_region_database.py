@@ -2,17 +2,22 @@
 	Additional databases are represented by their own RegionDatabase objects.
 """
 import os
+import time
 from pprint import pprint
 from functools import partial
+from collections import OrderedDict
 from ..utilities import ValidateApiResponse, ValidateSqlResponse
 pprint = partial(pprint, width = 180)
 
-from pony.orm import Database, db_session
+from pony.orm import Database, db_session, select, MultipleObjectsFoundError
 import progressbar
 
 from . import entities
 
-from ..utilities import validation
+from ..utilities import validation, encoding
+from ..utilities.cache import VALUE_CACHE
+import numpy
+import pandas
 from ..widgets import *
 from ..github import timetools, numbertools
 from ..data import configuration
@@ -26,22 +31,144 @@ standard_datasets = {
 	'test':   os.path.join(database_folder, 'test_database.sqlite')
 }
 
-XY_SEPARATOR = '|'
-POINT_SEPARATOR = '||'
-
 SQL_ARGUMENT_VALIDATION = ValidateSqlResponse()
 
+# Records the progress of each report import so an interrupted import can be resumed.
+IMPORT_CHECKPOINT_TABLE = 'ImportCheckpoint'
+
+# Marks identifiers shared by regions in different namespaces in the region index.
+AMBIGUOUS_IDENTIFIER = object()
+
+# The number of values passed to a single 'IN (...)' clause. Older sqlite builds allow at most 999.
+MAX_QUERY_PARAMETERS = 900
+
+# Full-text index over the series definitions, reports and regions. See RegionDatabase.search().
+SEARCH_TABLE = 'SearchIndex'
+SEARCH_COLUMNS = ['kind', 'report', 'code', 'name', 'description', 'notes']
+SEARCH_SCHEMA = 'CREATE VIRTUAL TABLE IF NOT EXISTS "{}" USING fts5(kind UNINDEXED, report UNINDEXED, code, name, description, notes)'.format(
+	SEARCH_TABLE
+)
+SEARCH_INSERT_QUERY = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+	SEARCH_TABLE, ', '.join(SEARCH_COLUMNS), ', '.join('?' for _ in SEARCH_COLUMNS)
+)
+# Fills the index from the existing entities.
+SEARCH_POPULATE_QUERIES = [
+	'INSERT INTO "{}" SELECT \'series\', "report", "code", "name", "description", "notes" FROM "SeriesDefinition"'.format(SEARCH_TABLE),
+	'INSERT INTO "{}" SELECT \'report\', "name", "code", "name", \'\', \'\' FROM "Report"'.format(SEARCH_TABLE),
+	'INSERT INTO "{}" SELECT \'region\', \'\', "code", "name", \'\', \'\' FROM "Region"'.format(SEARCH_TABLE)
+]
+# The bm25() weight of each column. Matches in the name rank highest.
+SEARCH_WEIGHTS = [0.0, 0.0, 5.0, 10.0, 3.0, 1.0]
+
+# PRAGMAs applied to every sqlite connection, by profile. Each profile sets the same PRAGMAs
+# so that switching profiles on an existing connection fully replaces the previous one.
+# The exception is journal_mode, which is saved in the database file itself: 'serve' leaves the
+# file's current mode alone, since changing it would write to a database opened as read-only.
+# 'default': sqlite's own settings.
+# 'bulk': for large imports. Trades durability for speed; an interrupted import may corrupt the file.
+# 'serve': for read-only use. Writes are rejected and the file is memory-mapped.
+CONNECTION_PROFILES = {
+	'default': [
+		('journal_mode', 'DELETE'),
+		('synchronous', 'FULL'),
+		('cache_size', -2000),  # KiB
+		('temp_store', 'DEFAULT'),
+		('mmap_size', 0),
+		('query_only', 'OFF')
+	],
+	'bulk':    [
+		('journal_mode', 'WAL'),
+		('synchronous', 'OFF'),
+		('cache_size', -512 * 1024),
+		('temp_store', 'MEMORY'),
+		('mmap_size', 0),
+		('query_only', 'OFF')
+	],
+	'serve':   [
+		('synchronous', 'FULL'),
+		('cache_size', -128 * 1024),
+		('temp_store', 'MEMORY'),
+		('mmap_size', 2 * 1024**3),
+		('query_only', 'ON')
+	]
+}
+
+class RegionMapping(OrderedDict):
+	""" The regions returned by RegionDatabase.getRegions(), keyed by the requested keys.
+		Attributes
+		----------
+		missing: list<str>
+			The keys that could not be matched to a region.
+	"""
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.missing = list()
+
+
 class RegionDatabase:
-	def __init__(self, filename, create = False, replace = False):
+	def __init__(self, filename, create = False, replace = False, profile = None):
 		"""
 			Parameters
 			----------
 				filename: string
 					Either a path to a region database or the name of a commonly used database.
+				profile: {'default', 'bulk', 'serve'}; default None
+					The connection profile to use. See CONNECTION_PROFILES.
+					Defaults to 'default'.
 		"""
 
 		self.create = create
+		self.profile = self._getProfile(profile)
+		self._region_index = None
+		if create and self.profile == 'serve':
+			message = "The 'serve' profile is read-only and cannot be used to create a database."
+			raise ValueError(message)
 		self._main_database = self._initializeDatabase(filename, create, replace)
+
+	@staticmethod
+	def _getProfile(profile):
+		if profile is None:
+			profile = 'default'
+		if profile not in CONNECTION_PROFILES:
+			message = "'{}' is not a valid connection profile. Expected one of {}".format(
+				profile, sorted(CONNECTION_PROFILES)
+			)
+			raise KeyError(message)
+		return profile
+
+	def _applyProfile(self, connection):
+		""" Applies the PRAGMAs of the current profile to a new sqlite connection. """
+		for pragma, value in CONNECTION_PROFILES[self.profile]:
+			connection.execute('PRAGMA {} = {}'.format(pragma, value))
+
+	def setProfile(self, profile):
+		""" Switches the connection profile of the database.
+			The current connection is closed so the profile applies to the next one. Must not be
+			called from within a db_session.
+			Pony keeps a separate connection for each thread, and only the connection of the calling
+			thread is closed. Connections already opened by other threads keep the previous profile
+			until they are closed, so the profile should be set before other threads use the database.
+			Parameters
+			----------
+				profile: {'default', 'bulk', 'serve'}
+		"""
+		self.profile = self._getProfile(profile)
+		if self.filename != ':memory:':
+			self._main_database.disconnect()
+		else:
+			# An in-memory database only lives as long as its connection.
+			with db_session:
+				for pragma, value in CONNECTION_PROFILES[self.profile]:
+					self._query('PRAGMA {} = {}'.format(pragma, value))
+
+	def _query(self, query, parameters = None):
+		""" Executes raw sql and returns the cursor. Must be called from within a db_session.
+			Unlike Database.get_connection(), this does not begin a write transaction, so
+			it can be used with the 'serve' profile.
+			Parameters should be passed as a tuple, since a list is treated as a sequence of rows.
+		"""
+		return self._main_database._exec_sql(query, parameters)
+
 	@db_session
 	def _getEntityClass(self, entity):
 		""" Matches an entity string to the corresponding class.
@@ -50,7 +177,7 @@ class RegionDatabase:
 
 				entity: str,Entity
 				{
-					'agency', 'identifier', 'namespace', 'observation', 'region', 'series', 'tag', 'unit', 'scale'
+					'agency', 'identifier', 'namespace', 'observation', 'region', 'series', 'definition', 'tag', 'unit', 'scale'
 				}
 
 		"""
@@ -67,6 +194,8 @@ class RegionDatabase:
 			_class = self.Report
 		elif entity == 'series':
 			_class = self.Series
+		elif entity == 'definition':
+			_class = self.SeriesDefinition
 		elif entity == 'tag':
 			_class = self.Tag
 		elif entity == 'unit':
@@ -99,7 +228,11 @@ class RegionDatabase:
 			os.remove(self.filename)
 
 		_database = Database()
-		_entities = entities.importDatabaseEntities(_database)
+		if self.filename == ':memory:':
+			self._cache_database = '{}:{}'.format(self.filename, id(_database))
+		else:
+			self._cache_database = os.path.abspath(self.filename)
+		_entities = entities.importDatabaseEntities(_database, self._cache_database)
 
 		#Agency, Identifier, Namespace, Observation, Region, Report, Series, Tag, Unit, Scale = _entities
 
@@ -109,12 +242,16 @@ class RegionDatabase:
 		self.Region 	= _entities['region']
 		self.Report 	= _entities['report']
 		self.Series 	= _entities['series']
+		self.SeriesDefinition = _entities['definition']
 		self.Tag 		= _entities['tag']
 		self.Unit 		= _entities['unit']
 		self.Scale 		= _entities['scale']
 
+		_database.on_connect(provider = 'sqlite')(lambda _, connection: self._applyProfile(connection))
 		_database.bind("sqlite", self.filename, create_db = create) #create_tables
 		_database.generate_mapping(create_tables = create)
+		if create:
+			self._createSearchIndex(_database)
 
 		return _database
 
@@ -134,11 +271,59 @@ class RegionDatabase:
 			return None
 		SQL_ARGUMENT_VALIDATION.validateResponse(entity_type, kwargs)
 		entity_class = self._getEntityClass(entity_type)
+		if entity_type == 'series':
+			kwargs = self._addSeriesDefinition(kwargs)
 
 		result = entity_class(**kwargs)
 
+		if entity_type == 'namespace':
+			self._region_index = None
+		elif entity_type == 'region':
+			self._indexRegion(result)
+			self._executeMany(SEARCH_INSERT_QUERY, [('region', '', result.code, result.name, '', '')])
+		elif entity_type == 'identifier':
+			self._indexIdentifier(result)
+		elif entity_type == 'report':
+			self._executeMany(SEARCH_INSERT_QUERY, [('report', result.name, result.code, result.name, '', '')])
+
 		return result
 
+	def _addSeriesDefinition(self, series_data):
+		""" Saves the name, description and notes of a series in the definition shared by every
+			region, creating the definition if this is the first region with the series.
+			Parameters
+			----------
+			series_data: dict<>
+				The arguments used to create a Series entity.
+			Returns
+			-------
+			dict<>
+				The arguments with 'name', 'description' and 'notes' replaced by 'localname',
+				'localdescription' and 'localnotes'. These are empty unless the text differs from the
+				definition.
+		"""
+		series_data = series_data.copy()
+		name = series_data.pop('name')
+		description = series_data.pop('description', '') or ''
+		notes = series_data.pop('notes', '') or ''
+
+		definition = self.SeriesDefinition.get(report = series_data['report'], code = series_data['code'])
+		if definition is None:
+			definition = self.SeriesDefinition(
+				report = series_data['report'],
+				code = series_data['code'],
+				name = name,
+				description = description,
+				notes = notes
+			)
+			search_row = ('series', definition.report.name, definition.code, definition.name, description, notes)
+			self._executeMany(SEARCH_INSERT_QUERY, [search_row])
+
+		series_data['localname'] = '' if name == definition.name else name
+		series_data['localdescription'] = '' if description == definition.description else description
+		series_data['localnotes'] = '' if notes == definition.notes else notes
+		return series_data
+
 	@db_session
 	def select(self, entity_type, expression):
 		entity_class = self._getEntityClass(entity_type)
@@ -185,6 +370,36 @@ class RegionDatabase:
 	##########################
 	#    Private Methods     #
 	##########################
+	@staticmethod
+	def _encodeSeriesValues(series_values):
+		""" Converts a list of (x, y) pairs into the attributes used to store them.
+			Values are packed into 'binvalues' unless one of the x-values cannot be
+			represented as a year, in which case the 'strvalues' format is used.
+			The summary statistics of the series are included. See encoding.summarizeValues().
+			Parameters
+			----------
+			series_values: list<tuple<x, float>>
+			Returns
+			-------
+			dict<>
+		"""
+		binvalues = encoding.packValues(series_values)
+		if binvalues is None:
+			result = {'strvalues': encoding.joinStringValues(series_values)}
+			try:
+				_, years, values = encoding.decodeStringValues([result['strvalues']])
+			except ValueError:
+				years = values = None
+		else:
+			result = {'binvalues': binvalues}
+			years, values = encoding.unpackValues(binvalues)
+
+		if years is None:
+			result.update(dict.fromkeys(encoding.SUMMARY_KEYS))
+		else:
+			result.update(encoding.summarizeValues(years, values))
+		return result
+
 	@db_session
 	def _searchByString(self, entity_type, string):
 		"""
@@ -354,39 +569,124 @@ class RegionDatabase:
 
 		return namespace_entity
 	
-	def summary(self, section = 'all'):
+	def summary(self, section = 'all', report = None, limit = None, offset = 0, table = True):
 		"""
 			Parameters
 			----------
 			section: {'all', 'regions', 'subjects', 'reports', 'series'}
+			report: str; default None
+				Only lists the series of this report.
+			limit: int; default None
+			offset: int; default 0
+				Only lists part of the catalogue. See iterateCatalogue().
+			table: bool; default True
+				If True, the catalogue is rendered as a Texttable after every row has been read.
+				Otherwise each row is printed as soon as it is read.
+			Returns
+			-------
+			Texttable, None
 		"""
 
 		# List available regions
 		if section in {'all', 'regions'}:
 			print("Available Regions")
-			for region in sorted(self.select('region', lambda s: s), key = lambda s: s.name):
-				print("\t", region.name)
-
-		display_table = Texttable()
-		display_table. set_cols_width([20, 20, 30, 60, 60])
-		display_table.add_row(['reportName', 'seriesCode', 'seriesName', 'seriesDescription', 'seriesNotes'])
+			with db_session:
+				for (region_name,) in self._query('SELECT "name" FROM "Region" ORDER BY "name"'):
+					print("\t", region_name)
 
+		display_table = None
 		# List available reports/subjects
 		if section in {'all', 'subjects', 'series', 'reports'}:
 			print("Available Reports")
-			for report in self.select('report', lambda s: s):
-				#print("\t", report.name)
-				display_table.add_row([report.name, "", "", "", ""])
-				seen = set()
-				report_series  =self.select('series', lambda s: s.report == report)
-				report_series.order_by(lambda s: s.name)
-				for series in report_series:
-					if series.code in seen: continue
-					else: seen.add(series.code)
-					#print("\t\t{:<12}\t{}".format("'{}'".format(series.code), series.name))
-					display_table.add_row(["", "'{}'".format(series.code), series.name, series.description, series.notes])
-		print(display_table.draw())
+			if table:
+				display_table = Texttable()
+				display_table.set_cols_width([20, 20, 30, 8, 10, 60, 60])
+				display_table.add_row(
+					['reportName', 'seriesCode', 'seriesName', 'regions', 'years', 'seriesDescription', 'seriesNotes']
+				)
+
+			current_report = None
+			for series in self.iterateCatalogue(report, limit, offset):
+				if series['reportName'] != current_report:
+					current_report = series['reportName']
+					if table:
+						display_table.add_row([current_report, "", "", "", "", "", ""])
+					else:
+						print(current_report)
+
+				series_code = "'{}'".format(series['seriesCode'])
+				years = "{}-{}".format(series['firstYear'], series['lastYear'])
+				if table:
+					display_table.add_row([
+						"", series_code, series['seriesName'], series['regions'], years,
+						series['seriesDescription'], series['seriesNotes']
+					])
+				else:
+					print("\t{:<20}\t{:<40}\t{:>6}\t{}".format(series_code, series['seriesName'], series['regions'], years))
+
+			if table:
+				print(display_table.draw())
 		return display_table
+
+	def getCatalogue(self, report = None, limit = None, offset = 0):
+		""" Returns one page of the catalogue as a list. See iterateCatalogue(). """
+		return list(self.iterateCatalogue(report, limit, offset))
+
+	def iterateCatalogue(self, report = None, limit = None, offset = 0, batch_size = 1000):
+		""" Lists every series code in the database with the number of regions and the years covered.
+			The catalogue is aggregated by a single query, ordered by report and code, and read
+			`batch_size` rows at a time. The database session stays open until the iteration ends.
+			Parameters
+			----------
+			report: str; default None
+				Only lists the series of this report.
+			limit: int; default None
+				The maximum number of series codes to list.
+			offset: int; default 0
+				The number of series codes to skip.
+			batch_size: int; default 1000
+			Yields
+			------
+			dict<>
+				* 'reportName', 'seriesCode', 'seriesName', 'seriesDescription', 'seriesNotes': str
+				* 'regions': int
+					The number of regions with the series.
+				* 'firstYear', 'lastYear': int
+		"""
+		if report is None:
+			condition = ''
+			parameters = list()
+		else:
+			condition = 'WHERE "report" = ?'
+			parameters = [report]
+		parameters += [-1 if limit is None else limit, offset]
+
+		query = """SELECT a."report", a."code", d."name", d."description", d."notes", a."regions", a."firstyear", a."lastyear"
+			FROM (
+				SELECT "report", "code", COUNT(*) AS "regions", MIN("firstyear") AS "firstyear", MAX("lastyear") AS "lastyear"
+				FROM "Series" {} GROUP BY "report", "code"
+			) a
+			LEFT JOIN "SeriesDefinition" d ON d."report" = a."report" AND d."code" = a."code"
+			ORDER BY a."report", a."code" LIMIT ? OFFSET ?""".format(condition)
+
+		with db_session:
+			cursor = self._query(query, tuple(parameters))
+			while True:
+				rows = cursor.fetchmany(batch_size)
+				if len(rows) == 0:
+					break
+				for report_name, code, name, description, notes, regions, first_year, last_year in rows:
+					yield {
+						'reportName':        report_name,
+						'seriesCode':        code,
+						'seriesName':        name,
+						'seriesDescription': description,
+						'seriesNotes':       notes,
+						'regions':           regions,
+						'firstYear':         first_year,
+						'lastYear':          last_year
+					}
+
 	@db_session
 	def exists(self, entity_type, key):
 		""" Wrapper around self.select(entity_type, expression).exists() """
@@ -420,33 +720,242 @@ class RegionDatabase:
 			-------
 			region: Region; default None
 		"""
-		if isinstance(key, str):
-			region = self.get('region', code = key)
-		else:
+		if not isinstance(key, str):
+			return getattr(key, 'region', None)
+
+		region_code = self.resolveRegions([key], namespace)[0]
+		if region_code is None:
 			region = None
+		else:
+			region = self.Region.get(code = region_code)
 
-		if region is None:
-			if namespace is None:
-				identifier = self.get('identifier', string = key)
-			else:
-				if not isinstance(namespace, str):
-					namespace_code = namespace.code
-				else:
-					namespace_code = namespace
-				identifier = self.get('identifier', lambda s: s.string == key and s.namespace.code == namespace_code)
-			if identifier is not None:
-				region = identifier.region
+		return region
+
+	@db_session
+	def search(self, text, kind = None, report = None, limit = 20):
+		""" Searches the names, descriptions and notes of every series, report and region.
+			Parameters
+			----------
+			text: str
+				The words to search for. Every word must match, and words match as prefixes,
+				so 'gdp curr' matches 'GDP (current US$)'. Series codes such as 'NY.GDP.MKTP.CD' also match.
+			kind: {'series', 'report', 'region'}; default None
+				Only returns results of this kind.
+			report: str; default None
+				Only returns the series of this report.
+			limit: int; default 20
+			Returns
+			-------
+			list<dict>
+				The best matches first.
+				* 'entityType': {'series', 'report', 'region'}
+				* 'reportName': str
+					The report of a series. Empty for regions.
+				* 'code': str
+				* 'name': str
+				* 'score': float
+					Higher is a better match.
+		"""
+		if not self._query('SELECT 1 FROM sqlite_master WHERE name = ?', (SEARCH_TABLE,)).fetchone():
+			message = "The database does not have a search index. Use RegionDatabase.rebuildSearchIndex() to create it."
+			raise ValueError(message)
+
+		words = [i.replace('"', '""') for i in text.split()]
+		if len(words) == 0:
+			return list()
+		match = ' '.join('"{}"*'.format(i) for i in words)
+
+		query = 'SELECT kind, report, code, name, bm25("{0}", {1}) AS score FROM "{0}" WHERE "{0}" MATCH ?'.format(
+			SEARCH_TABLE, ', '.join(str(i) for i in SEARCH_WEIGHTS)
+		)
+		parameters = [match]
+		if kind is not None:
+			query += ' AND kind = ?'
+			parameters.append(kind)
+		if report is not None:
+			query += ' AND report = ?'
+			parameters.append(report)
+		query += ' ORDER BY score LIMIT ?'
+		parameters.append(limit)
+
+		result = list()
+		for row_kind, row_report, code, name, score in self._query(query, tuple(parameters)):
+			result.append({
+				'entityType': row_kind,
+				'reportName': row_report,
+				'code':       code,
+				'name':       name,
+				'score':      -score
+			})
+		return result
+
+	def rebuildSearchIndex(self):
+		""" Recreates the search index from the series definitions, reports and regions in the database.
+			Only needed for databases created before the index was added.
+		"""
+		with db_session:
+			self._main_database.get_connection().execute('DROP TABLE IF EXISTS "{}"'.format(SEARCH_TABLE))
+		self._createSearchIndex(self._main_database)
+
+	@staticmethod
+	@db_session
+	def _createSearchIndex(database):
+		""" Creates and fills the search index if it does not exist. """
+		if database._exec_sql('SELECT 1 FROM sqlite_master WHERE name = ?', (SEARCH_TABLE,)).fetchone():
+			return
+		connection = database.get_connection()
+		connection.execute(SEARCH_SCHEMA)
+		for query in SEARCH_POPULATE_QUERIES:
+			connection.execute(query)
+
+	def resolveRegions(self, keys, namespace = None):
+		""" Matches a number of region codes or identifiers to the codes of the regions they refer to.
+			Keys are resolved with an in-memory index rather than by querying the database
+			for each key. See _getRegionIndex().
+			Parameters
+			----------
+			keys: list<str>
+			namespace: str, Namespace; default None
+				The namespace the identifiers belong to. If not given, identifiers are
+				searched for in every namespace.
+			Returns
+			-------
+			list<str>
+				The region code matching each key, or None if the key does not refer to a region.
+		"""
+		if namespace is None or isinstance(namespace, str):
+			namespace_code = namespace
+		else:
+			namespace_code = namespace.code
+
+		region_codes, identifiers = self._getRegionIndex()
+		result = list()
+		for key in keys:
+			if key in region_codes:
+				region_code = key
 			else:
-				region = None
+				region_code = identifiers.get((namespace_code, key))
+				if region_code is AMBIGUOUS_IDENTIFIER:
+					message = "'{}' identifies more than one region. Specify the namespace to search through.".format(key)
+					raise MultipleObjectsFoundError(message)
+			result.append(region_code)
+
+		return result
+
+	def _getRegionIndex(self):
+		""" Returns the index used to resolve region keys, building it on first use.
+			New regions and identifiers are added to the index as they are inserted, and the
+			index is discarded when a namespace is added. Changes made to the database file by
+			other processes are not tracked, and regions inserted by a transaction that is later
+			rolled back remain in the index until it is rebuilt.
+			Returns
+			-------
+			region_codes, identifiers: set<str>, dict<tuple<str, str>, str>
+				The code of every region, and the region code of each (namespace code, identifier)
+				pair. Identifiers are also indexed under the namespace code None.
+		"""
+		if self._region_index is None:
+			self._region_index = self._buildRegionIndex()
+		return self._region_index
+
+	@db_session
+	def _buildRegionIndex(self):
+		region_codes = set(select(r.code for r in self.Region))
+		identifiers = dict()
+		for namespace_code, string, region_code in select((i.namespace.code, i.string, i.region.code) for i in self.Identifier):
+			self._addIdentifierKey(identifiers, namespace_code, string, region_code)
+
+		return region_codes, identifiers
+
+	@staticmethod
+	def _addIdentifierKey(identifiers, namespace_code, string, region_code):
+		identifiers[namespace_code, string] = region_code
+		if identifiers.setdefault((None, string), region_code) != region_code:
+			identifiers[None, string] = AMBIGUOUS_IDENTIFIER
+
+	def _indexRegion(self, region):
+		if self._region_index is not None:
+			self._region_index[0].add(region.code)
+
+	def _indexIdentifier(self, identifier):
+		if self._region_index is not None:
+			self._addIdentifierKey(
+				self._region_index[1], identifier.namespace.code, identifier.string, identifier.region.code
+			)
 
-		return region
-	
 	@db_session
 	def getRegions(self, keys, namespace = None):
-		""" Searches for a number of regions. """
+		""" Searches for a number of regions at once.
+			The keys are resolved with the region index (see resolveRegions()) and the regions
+			are then loaded with a single query rather than one query per key.
+			Parameters
+			----------
+			keys: list<str>
+				The codes or identifiers of each region.
+			namespace: str, Namespace; default None
+				See getRegion().
+			Returns
+			-------
+			RegionMapping
+				Maps each key to its region, in the order the keys were given. Keys that do
+				not refer to a region are listed in `RegionMapping.missing`.
+		"""
+		keys = list(keys)
+		region_codes = self.resolveRegions(keys, namespace)
 
-		for key in keys:
-			yield self.getRegion(key, namespace)
+		codes = {i for i in region_codes if i is not None}
+		regions = {r.code: r for r in self._selectBatches(lambda batch: select(r for r in self.Region if r.code in batch), codes)}
+
+		result = RegionMapping()
+		for key, region_code in zip(keys, region_codes):
+			region = regions.get(region_code)
+			if region is None:
+				result.missing.append(key)
+			else:
+				result[key] = region
+
+		return result
+
+	@db_session
+	def loadValues(self, series):
+		""" Decodes the values of a number of series at once.
+			Series found in the value cache are not decoded again. The decoded arrays are added
+			to the value cache and to each series, so Series.arrays does not decode them again.
+			Parameters
+			----------
+			series: list<Series>
+			Returns
+			-------
+			offsets, years, values: numpy.ndarray
+				The values of the i-th series are stored in years[offsets[i]:offsets[i+1]] and
+				values[offsets[i]:offsets[i+1]].
+		"""
+		series = list(series)
+		series_arrays = [VALUE_CACHE.get(i.cacheKey) for i in series]
+		missing = [i for i, arrays in zip(series, series_arrays) if arrays is None]
+
+		decoded_offsets, decoded_years, decoded_values = encoding.decodeValues(
+			[(i.binvalues, i.strvalues) for i in missing]
+		)
+		# Each series is copied out of the batch so a cached series does not keep the whole batch alive.
+		decoded_arrays = iter(
+			(decoded_years[i:j].copy(), decoded_values[i:j].copy())
+			for i, j in zip(decoded_offsets[:-1], decoded_offsets[1:])
+		)
+		for index, entity in enumerate(series):
+			if series_arrays[index] is None:
+				series_arrays[index] = next(decoded_arrays)
+				VALUE_CACHE.put(entity.cacheKey, series_arrays[index])
+			entity._arrays_cache = series_arrays[index]
+
+		offsets = numpy.zeros(len(series) + 1, dtype = numpy.int64)
+		numpy.cumsum([len(i[0]) for i in series_arrays], out = offsets[1:])
+		if len(series) == 0:
+			return offsets, decoded_years, decoded_values
+		years = numpy.concatenate([i[0] for i in series_arrays])
+		values = numpy.concatenate([i[1] for i in series_arrays])
+
+		return offsets, years, values
 
 	@db_session
 	def getSeries(self, region, key):
@@ -461,13 +970,221 @@ class RegionDatabase:
 		series = self.get('series', region = series_region, code = key)
 		return series
 
+	@db_session
+	def getPanel(self, report, key, regions = None, region_type = None, namespace = None):
+		""" Retrieves one series for a number of regions as a region x year matrix.
+			The series are read with a single query and decoded together.
+			Parameters
+			----------
+			report: str, Report, None
+				The name of the report the series belongs to. If None, the series is read from the only
+				report that has it. Raises ValueError if more than one report has the series.
+			key: str
+				The code of the series.
+			regions: list<str>; default None
+				Limits the panel to these regions, in this order, ex. the members of a composite region
+				such as UN_Geoschemes['Caribbean']. Regions without the series are included as rows of NaN.
+				Keys that do not refer to a region, and regions excluded by `region_type` or `namespace`,
+				are ignored. Only the series of these regions are read.
+			region_type: str; default None
+				Limits the panel to regions of this type, ex. 'country'.
+			namespace: str, Namespace; default None
+				Limits the panel to regions with an identifier in this namespace. Also used to resolve
+				the keys in `regions`.
+			Returns
+			-------
+			pandas.DataFrame
+				The values of the series, indexed by region code and year.
+		"""
+		if report is None:
+			reports = [i[0] for i in self._query('SELECT DISTINCT "report" FROM "Series" WHERE "code" = ? ORDER BY "report"', (key,))]
+			if len(reports) > 1:
+				message = "Multiple reports have the series '{}': {}. Specify the report.".format(key, reports)
+				raise ValueError(message)
+			report = reports[0] if reports else None
+		elif not isinstance(report, str):
+			report = report.name
+		if namespace is not None and not isinstance(namespace, str):
+			namespace = namespace.code
+
+		query = 'SELECT s."region", s."binvalues", s."strvalues" FROM "Series" s WHERE s."report" = ? AND s."code" = ?'
+		parameters = (report, key)
+		filters, filter_parameters = self._getRegionFilters('s."region"', region_type, namespace)
+		for condition in filters:
+			query += ' AND ' + condition
+		parameters += filter_parameters
+
+		if regions is None:
+			rows = self._query(query + ' ORDER BY s."region"', parameters).fetchall()
+		else:
+			requested = self._filterRegionCodes(
+				OrderedDict.fromkeys(i for i in self.resolveRegions(regions, namespace) if i is not None),
+				region_type, namespace
+			)
+			rows = list()
+			for index in range(0, len(requested), MAX_QUERY_PARAMETERS):
+				batch = tuple(requested[index:index + MAX_QUERY_PARAMETERS])
+				batch_query = query + ' AND s."region" IN ({})'.format(', '.join('?' for _ in batch))
+				rows += self._query(batch_query, parameters + batch).fetchall()
+
+		region_codes = [i[0] for i in rows]
+		offsets, years, values = encoding.decodeValues([(i[1], i[2]) for i in rows])
+		panel = self._toPanel(region_codes, offsets, years, values)
+
+		if regions is not None:
+			panel = panel.reindex(requested)
+
+		return panel
+
+	@staticmethod
+	def _getRegionFilters(column, region_type = None, namespace = None):
+		""" Returns the sql conditions limiting the region codes in `column` to a region type and/or
+			to regions with an identifier in a namespace. See getPanel().
+			Returns
+			-------
+			conditions, parameters: list<str>, tuple
+		"""
+		conditions = list()
+		parameters = tuple()
+		if region_type is not None:
+			conditions.append('{} IN (SELECT r."code" FROM "Region" r WHERE r."type" = ?)'.format(column))
+			parameters += (region_type,)
+		if namespace is not None:
+			conditions.append(
+				'EXISTS (SELECT 1 FROM "Identifier" i JOIN "Namespace" n ON n."name" = i."namespace" '
+				'WHERE i."region" = {} AND n."code" = ?)'.format(column)
+			)
+			parameters += (namespace,)
+		return conditions, parameters
+
+	def _filterRegionCodes(self, region_codes, region_type = None, namespace = None):
+		""" Returns the region codes that pass _getRegionFilters(), in their original order. """
+		region_codes = list(region_codes)
+		conditions, parameters = self._getRegionFilters('g."code"', region_type, namespace)
+		if len(conditions) == 0:
+			return region_codes
+
+		matched = set()
+		for index in range(0, len(region_codes), MAX_QUERY_PARAMETERS):
+			batch = tuple(region_codes[index:index + MAX_QUERY_PARAMETERS])
+			query = 'SELECT g."code" FROM "Region" g WHERE g."code" IN ({}) AND {}'.format(
+				', '.join('?' for _ in batch), ' AND '.join(conditions)
+			)
+			matched.update(i[0] for i in self._query(query, batch + parameters))
+		return [i for i in region_codes if i in matched]
+
+	@staticmethod
+	def _toPanel(region_codes, offsets, years, values):
+		""" Arranges the decoded values of a number of series into a region x year dataframe.
+			Parameters
+			----------
+			region_codes: list<str>
+				The region of each series.
+			offsets, years, values: numpy.ndarray
+				See encoding.decodeValues().
+			Returns
+			-------
+			pandas.DataFrame
+		"""
+		columns, year_index = numpy.unique(years, return_inverse = True)
+		row_index = numpy.repeat(numpy.arange(len(region_codes)), numpy.diff(offsets))
+		matrix = numpy.full((len(region_codes), len(columns)), numpy.nan)
+		matrix[row_index, year_index] = values
+
+		panel = pandas.DataFrame(
+			matrix,
+			index = pandas.Index(region_codes, name = 'regionCode'),
+			columns = pandas.Index(columns, name = 'year')
+		)
+		return panel
+
+	def getCrossSection(self, report, key, year, method = 'interpolate', **kwargs):
+		""" Retrieves the value of one series at a single year for a number of regions.
+			Values are interpolated over the whole panel at once rather than series by series.
+			Parameters
+			----------
+			report: str, Report
+			key: str
+				The code of the series.
+			year: int, float
+			method: {'interpolate', 'inner', 'exact'}; default 'interpolate'
+				Matches DataSeries.getValue():
+				* 'interpolate': interpolates between the surrounding values. Years outside a series
+					are given the first or last value of the series.
+				* 'inner': only interpolates between the first and last year of each series.
+				* 'exact': only returns values saved for the given year.
+			**kwargs
+				Limits the regions included. See getPanel().
+			Returns
+			-------
+			pandas.Series
+				The value for each region code. Regions without a value are NaN.
+		"""
+		panel = self.getPanel(report, key, **kwargs)
+		values = self._interpolatePanel(panel.values, panel.columns.values, year, method)
+		return pandas.Series(values, index = panel.index, name = year)
+
+	@staticmethod
+	def _interpolatePanel(matrix, years, year, method):
+		""" Linearly interpolates every row of a region x year matrix at a single year. NaN are skipped.
+			Parameters
+			----------
+			matrix: numpy.ndarray<float64>
+			years: numpy.ndarray<int>
+				The year of each column, in ascending order.
+			year: int, float
+			method: {'interpolate', 'inner', 'exact'}
+			Returns
+			-------
+			numpy.ndarray<float64>
+		"""
+		if method not in {'interpolate', 'inner', 'exact'}:
+			message = "'{}' is not a valid method. Expected one of 'interpolate', 'inner', 'exact'.".format(method)
+			raise ValueError(message)
+		if matrix.shape[1] == 0:
+			return numpy.full(matrix.shape[0], numpy.nan)
+
+		rows = numpy.arange(matrix.shape[0])
+		columns = numpy.arange(matrix.shape[1])
+		is_valid = ~numpy.isnan(matrix)
+
+		# The closest column with a value on either side of `year`.
+		left = numpy.where(is_valid & (years <= year), columns, -1).max(axis = 1, initial = -1)
+		right = numpy.where(is_valid & (years >= year), columns, len(columns)).min(axis = 1, initial = len(columns))
+		has_left = left >= 0
+		has_right = right < len(columns)
+		left = numpy.where(has_left, left, 0)
+		right = numpy.where(has_right, right, 0)
+
+		result = numpy.full(matrix.shape[0], numpy.nan)
+
+		is_exact = has_left & (years[left] == year)
+		result[is_exact] = matrix[rows[is_exact], left[is_exact]]
+		if method == 'exact':
+			return result
+
+		is_inner = has_left & has_right & ~is_exact
+		left_years, right_years = years[left[is_inner]], years[right[is_inner]]
+		left_values, right_values = matrix[rows[is_inner], left[is_inner]], matrix[rows[is_inner], right[is_inner]]
+		weights = (year - left_years) / (right_years - left_years)
+		result[is_inner] = left_values + weights * (right_values - left_values)
+
+		if method == 'interpolate':
+			is_before = has_right & ~has_left
+			is_after = has_left & ~has_right
+			result[is_before] = matrix[rows[is_before], right[is_before]]
+			result[is_after] = matrix[rows[is_after], left[is_after]]
+
+		return result
+
 
 
 	# Methods for adding data to the database.
-	@db_session
-	def addReport(self, report, namespace, verbose = False):
+	def addReport(self, report, namespace, verbose = False, defer_indexes = False, batch_size = 10000):
 		"""
 			Adds a report to the database.
+			The series are committed in batches. If the import is interrupted, calling addReport()
+			again with the same report resumes after the last committed batch.
 		Parameters
 		----------
 			report: dict<>
@@ -482,14 +1199,25 @@ class RegionDatabase:
 					* 'seriesName': str
 					* 'seriesScale': str
 					* 'seriesDescription': str
+					* 'seriesNotes': str
 					* 'seriesValues': list<Timestamp, float>
 				* 'scales': list<dict>
 				* 'units': list<dict>
 			namespace: str
 			verbose: bool; default False
+			defer_indexes: bool; default False
+				If True, secondary indexes are dropped before the import and rebuilt afterwards.
+				See _deferIndexes().
+			batch_size: int; default 10000
+				The number of series committed per transaction.
 
-
+		Returns
+		-------
+			dict<str, float>, None
+				The time spent in each phase of the import if `defer_indexes` is True.
 		"""
+		if defer_indexes:
+			return self._deferIndexes(self.addReport, report, namespace, verbose = verbose, batch_size = batch_size)
 		########################## Setup #######################################
 		print("Importing from Dict...", flush = True)
 		timer = timetools.Timer()
@@ -498,22 +1226,63 @@ class RegionDatabase:
 
 
 		############################## Workflow ###############################
+		report_name = report['report']['reportName']
+		VALUE_CACHE.invalidate(self._cache_database, report_name)
+		checkpoint = self._getImportCheckpoint(report_name)
+
+		region_codes = self._addReportEntities(report, namespace, checkpoint is None, verbose)
+		if region_codes is None:
+			print("The report '{}' already exists in the database.".format(report_name))
+			return None
+
+		############################# Add Series ####################################
+		if verbose:
+			print("Adding series...")
+		if checkpoint:
+			print("Resuming the import after {} of {} series...".format(checkpoint, len(report['series'])))
+
+		pbar = progressbar.ProgressBar(max_value = len(report['series']))
+		for position, batch in self._iterateBatches(report['series'], batch_size, checkpoint):
+			self._addReportSeries(report_name, batch, region_codes, position)
+			pbar.update(position)
+		pbar.finish()
+		self._clearImportCheckpoint(report_name)
+
+		# print("Imported {} of {} series".format(len(data['series']) - len(skipped), len(data['series'])))
+		db_size = self.filesize
+		print("Size of database: {:.2f} MB".format(db_size))
+		print("Finished in ", timer)
+		if verbose:
+			print("Could not locate these regions: ")
+
+	@db_session
+	def _addReportEntities(self, report, namespace, is_new, verbose):
+		""" Adds the report, regions, scales and units of a report passed to addReport().
+			Parameters
+			----------
+				is_new: bool
+					Whether the import is starting rather than resuming. When resuming, the
+					report already exists and the other entities are only added if missing.
+			Returns
+			-------
+				dict<str, str>, None
+					Maps each region key in the report to the code of the region.
+					None if the report already exists and the import is not being resumed.
+		"""
 		if verbose:
 			print("Adding the report...")
 		namespace = self.addNamespace(namespace)
 
-		#report_namespace = self.get('namespace', namespace)
 		report_name = report['report']['reportName']
-		# Check if the report already exists.
-		agency_entity = self.access('import', 'agency', report['agency'])
-		report_information = report['report']
-		report_information['reportAgency'] = agency_entity
-
-		if self.exists('report', report_name):
-			print("The report '{}' already exists in the database.".format(report_name))
-			return None
-		else:
-			report_entity = self.access('insert', 'report', report_information)
+		if is_new:
+			# Check if the report already exists.
+			if self.exists('report', report_name):
+				return None
+			agency_entity = self.access('import', 'agency', report['agency'])
+			report_information = report['report']
+			report_information['reportAgency'] = agency_entity
+			self.access('insert', 'report', report_information)
+			self._setImportCheckpoint(report_name, 0)
 
 		self._main_database.commit()
 
@@ -523,7 +1292,7 @@ class RegionDatabase:
 		if verbose:
 			print("Adding regions...")
 		_missing_regions = list()
-		region_entities = dict()
+		region_codes = dict()
 		for region in report['regions']:
 
 			region_key = region['regionCode']
@@ -546,13 +1315,13 @@ class RegionDatabase:
 					'namespace': namespace,
 					'region': region_entity
 				}
-				self.Identifier(**identifier_data)
+				self._indexIdentifier(self.Identifier(**identifier_data))
 
 			else:
 				# TODO update region identifiers
 				pass
 
-			region_entities[region_key] = region_entity
+			region_codes[region_key] = region_entity.code
 
 
 		print("Added {} of {} total regions.".format(len(_missing_regions), len(report['regions'])))
@@ -582,27 +1351,25 @@ class RegionDatabase:
 				}
 				self.access('insert', 'unit', unit_data)
 
-		############################# Add Series ####################################
-		if verbose:
-			print("Adding series...")
-
-		pbar = progressbar.ProgressBar(max_value = len(report['series']))
-		for index, series in enumerate(report['series']):
-			pbar.update(index)
+		self._main_database.commit()
+		return region_codes
 
+	@db_session
+	def _addReportSeries(self, report_name, batch, region_codes, position):
+		""" Adds a batch of series passed to addReport() and commits them along with the checkpoint. """
+		series_report = self.Report[report_name]
+		for series in batch:
 			region_key = series['regionKey']
 			scale_key = series['seriesScale']
 			unit_key = series['seriesUnits']
 
-			# series_region = self.getEntity('region', region_key)
-			series_region = region_entities[region_key]
-			series_report = report_entity
+			series_region = self.Region[region_codes[region_key]]
 			series_scale = self.getEntity('scale', scale_key)
 			series_unit = self.getEntity('unit', unit_key)
 
 			series_values = series['seriesValues']
 			series_values = [(i, numbertools.toNumber(j)) for i, j in series_values]
-			series_values = ["{}{}{}".format(i, XY_SEPARATOR, j) for i, j in series_values if not math.isnan(j)]
+			series_values = [(i, j) for i, j in series_values if not math.isnan(j)]
 
 			if len(series_values) == 0:
 				continue
@@ -611,25 +1378,22 @@ class RegionDatabase:
 				'code':        series['seriesCode'],
 				'name':        series['seriesName'],
 				'description': series['seriesDescription'],
+				'notes':       series['seriesNotes'],
 
 				# Relations
 				'scale':       series_scale,
 				'units':        series_unit,
 				'region':      series_region,
-				'report':      series_report,
-				'strvalues':   POINT_SEPARATOR.join(series_values)
+				'report':      series_report
 			}
+			series_data.update(self._encodeSeriesValues(series_values))
 
 			self.access('insert', 'series', series_data)
+
+		self._setImportCheckpoint(report_name, position)
 		self._main_database.commit()
-		# print("Imported {} of {} series".format(len(data['series']) - len(skipped), len(data['series'])))
-		db_size = self.filesize
-		print("Size of database: {:.2f} MB".format(db_size))
-		print("Finished in ", timer)
-		if verbose:
-			print("Could not locate these regions: ")
-	@db_session
-	def addFromApi(self, report, verbose = True):
+
+	def addFromApi(self, report, verbose = True, bulk = False, batch_size = 10000, defer_indexes = False):
 		"""
 			Adds a report formatted as an API response to the database.
 
@@ -638,7 +1402,9 @@ class RegionDatabase:
 		report: dict<>
 			* 'report': dict<>
 			* 'namespace': str
-			* 'regions': dict<>
+			* 'regions': list<dict<>>, iterable<dict<>>
+				May be an iterator, ex. TableApi(stream = True).data['regions']. The regions are
+				then parsed, validated and inserted one batch at a time.
 				* 'regionName': str
 				* 'regionIdentifiers': list<str>
 				* 'regionSeries': list<dict>
@@ -649,11 +1415,27 @@ class RegionDatabase:
 			* 'scales': list<dict<>>
 			* 'units': list<dict<>>
 		verbose: bool; default True
+		bulk: bool; default False
+			If True, scales, units and regions are resolved once and the series are inserted
+			directly with executemany() rather than through the Series entity.
+		batch_size: int; default 10000
+			The approximate number of series committed per transaction. Series are committed
+			at region boundaries, and an interrupted import resumes after the last committed region.
+		defer_indexes: bool; default False
+			If True, secondary indexes are dropped before the import and rebuilt afterwards.
+			See _deferIndexes().
 
 		Returns
 		-------
-
+		dict<str, float>, None
+			The time spent in each phase of the import if `defer_indexes` is True.
 		"""
+		if defer_indexes:
+			return self._deferIndexes(
+				self.addFromApi, report, verbose = verbose, bulk = bulk, batch_size = batch_size
+			)
+		if bulk:
+			return self._bulkAddFromApi(report, batch_size, verbose)
 		########################## Setup #######################################
 		print("Importing from Dict...", flush = True)
 		timer = timetools.Timer()
@@ -662,8 +1444,31 @@ class RegionDatabase:
 
 		ValidateApiResponse(report)
 
+		report_name = report['report']['reportName']
+		VALUE_CACHE.invalidate(self._cache_database, report_name)
+		checkpoint = self._getImportCheckpoint(report_name)
+		if checkpoint is None:
+			self._addApiReport(report)
+		else:
+			print("Resuming the import after region {}...".format(checkpoint))
+
+		batches = self._iterateBatches(
+			report['regions'], batch_size, checkpoint, size = lambda s: len(s['regionSeries'])
+		)
+		for position, regions in batches:
+			self._addApiRegions(report, regions, position)
+		self._clearImportCheckpoint(report_name)
 
-		report_namespace = self.addNamespace(report['namespace'])
+		db_size = self.filesize
+		print("Size of database: {:.2f} MB".format(db_size))
+		print("Finished in ", timer)
+		if verbose:
+			print("Could not locate these regions: ")
+
+	@db_session
+	def _addApiReport(self, report):
+		""" Adds the agency and report of an API response and begins its import checkpoint. """
+		self.addNamespace(report['namespace'])
 
 		report_data = report['report']
 		agency_data = report['agency']
@@ -672,10 +1477,17 @@ class RegionDatabase:
 		report_data['reportAgency'] = agency_entity
 
 		report_entity = self.access('insert', 'report', report_data)
+		self._setImportCheckpoint(report_entity.name, 0)
+		self._main_database.commit()
+		return report_entity
 
+	@db_session
+	def _addApiRegions(self, report, regions, position):
+		""" Adds a batch of regions from an API response and commits them along with the checkpoint. """
+		report_namespace = self.addNamespace(report['namespace'])
+		report_entity = self.Report[report['report']['reportName']]
 
-
-		for region_data in report['regions']:
+		for region_data in regions:
 
 			# Add region
 			region_key = region_data['regionCode']
@@ -689,7 +1501,6 @@ class RegionDatabase:
 					'name':         region_data['regionName'],
 					'parent': region_data['regionParent']
 				}
-
 				region_entity = self.access('insert', 'region', region_config)
 
 				identifier_data = {
@@ -697,7 +1508,7 @@ class RegionDatabase:
 					'namespace': report_namespace,
 					'region': region_entity
 				}
-				self.Identifier(**identifier_data)
+				self._indexIdentifier(self.Identifier(**identifier_data))
 
 			else:
 				# TODO update region identifiers
@@ -706,27 +1517,14 @@ class RegionDatabase:
 
 			for series_data in region_data['regionSeries']:
 
-				scale_data = series_data['seriesScale']
-				unit_data = series_data['seriesUnits']
-
-				if isinstance(scale_data, str):
-					scale_data = {
-						'string': scale_data.lower(),
-						'multiplier': float(numbertools.getMultiplier(scale_data))
-					}
-				if isinstance(unit_data, str):
-					unit_data = {
-						'string': unit_data,
-						'code': ''
-					}
+				scale_data = self._getScaleArguments(series_data['seriesScale'])
+				unit_data = self._getUnitArguments(series_data['seriesUnits'])
 
 				scale_entity = self.access('import', 'scale', scale_data)
 				unit_entity = self.access('import', 'unit', unit_data)
 
 				series_values = series_data['seriesValues']
 				if len(series_values) == 0: continue
-				series_values = ["{}{}{}".format(i, XY_SEPARATOR, j) for i,j  in series_values]
-				series_values = POINT_SEPARATOR.join(series_values)
 				series_config = {
 					'code':        series_data['seriesCode'],
 					'name':        series_data['seriesName'],
@@ -737,16 +1535,353 @@ class RegionDatabase:
 					'scale':       scale_entity,
 					'units':        unit_entity,
 					'region':      region_entity,
-					'report':      report_entity,
-					'strvalues':   series_values
+					'report':      report_entity
 				}
+				series_config.update(self._encodeSeriesValues(series_values))
 				self.access('insert', 'series', series_config)
 
+		self._setImportCheckpoint(report_entity.name, position)
+		self._main_database.commit()
+
+	def _bulkAddFromApi(self, report, batch_size, verbose):
+		""" Implements addFromApi(bulk = True).
+			Scales, units and regions are looked up once and kept in memory by key. The series are
+			inserted with executemany() and committed, with the checkpoint, about every `batch_size` series.
+			Each batch uses its own db_session so the entities it creates are released once it is committed.
+		"""
+		print("Importing from Dict (bulk)...", flush = True)
+		timer = timetools.Timer()
+		db_size = self.filesize
+		print("size of database: {:.2f} MB".format(db_size))
+
+		ValidateApiResponse(report)
+
+		with db_session:
+			namespace_name = self.addNamespace(report['namespace']).name
+
+			report_data = report['report']
+			agency_data = report['agency']
+			report_key = report_data['reportName']
+			VALUE_CACHE.invalidate(self._cache_database, report_key)
+			checkpoint = self._getImportCheckpoint(report_key)
+			if checkpoint is None:
+				report_data['reportAgency'] = self.access('import', 'agency', agency_data)
+				self.access('insert', 'report', report_data)
+				self._setImportCheckpoint(report_key, 0)
+			else:
+				print("Resuming the import after region {}...".format(checkpoint))
+
+			# The regions are read once, in batches, so they may be streamed.
+			region_map = self._getRegionMap(self.Namespace[namespace_name])
+			existing_scales = set(select(i.string for i in self.Scale))
+			existing_units = set(select(i.string for i in self.Unit))
+		missing_regions = list()
+		missing_scales = list()
+		missing_units = list()
+
+		# Each distinct scale and unit is only parsed once.
+		parsed_arguments = dict()
+		def _parseArguments(parser, data):
+			key = (parser, data if isinstance(data, str) else tuple(sorted(data.items())))
+			if key not in parsed_arguments:
+				parsed_arguments[key] = parser(data)
+			return parsed_arguments[key]
+
+		# The name, description and notes of each series code are saved once, in its definition.
+		with db_session:
+			definitions = {
+				code: (name, description, notes) for code, name, description, notes in
+				select((i.code, i.name, i.description, i.notes) for i in self.SeriesDefinition if i.report.name == report_key)
+			}
+
+		columns = self._getSeriesColumns()
+		insert_query = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+			self.Series._table_,
+			', '.join('"{}"'.format(i) for i in columns),
+			', '.join('?' for _ in columns)
+		)
+		definition_columns = [getattr(self.SeriesDefinition, i).columns[0] for i in ['report', 'code', 'name', 'description', 'notes']]
+		definition_query = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+			self.SeriesDefinition._table_,
+			', '.join('"{}"'.format(i) for i in definition_columns),
+			', '.join('?' for _ in definition_columns)
+		)
+
+		total = 0
+		pbar = progressbar.ProgressBar(max_value = self._getLength(report['regions']))
+		batches = self._iterateBatches(
+			report['regions'], batch_size, checkpoint, size = lambda s: len(s['regionSeries'])
+		)
+		for position, regions in batches:
+			with db_session:
+				report_namespace = self.Namespace[namespace_name]
+				############################# Regions ##################################
+				for region_data in regions:
+					region_key = region_data['regionCode']
+					if region_key in region_map:
+						continue
+					region_config = {
+						'code':   region_key,
+						'type':   region_data['regionType'],
+						'name':   region_data['regionName'],
+						'parent': region_data['regionParent']
+					}
+					region_entity = self.access('insert', 'region', region_config)
+					identifier = self.Identifier(string = region_key, namespace = report_namespace, region = region_entity)
+					self._indexIdentifier(identifier)
+					region_map[region_key] = region_entity.code
+					missing_regions.append(region_key)
+
+				####################### Scales and Units ##############################
+				for series_data in (j for i in regions for j in i['regionSeries']):
+					scale_data = _parseArguments(self._getScaleArguments, series_data['seriesScale'])
+					unit_data = _parseArguments(self._getUnitArguments, series_data['seriesUnits'])
+					if scale_data['string'] not in existing_scales:
+						self._insertEntity('scale', **scale_data)
+						existing_scales.add(scale_data['string'])
+						missing_scales.append(scale_data['string'])
+					if unit_data['string'] not in existing_units:
+						self._insertEntity('unit', **unit_data)
+						existing_units.add(unit_data['string'])
+						missing_units.append(unit_data['string'])
+				self._main_database.flush()
+
+				############################## Series ##################################
+				rows = list()
+				definition_rows = list()
+				for region_data, series_data in ((i, j) for i in regions for j in i['regionSeries']):
+					region_key = region_map[region_data['regionCode']]
+					series_values = series_data['seriesValues']
+					if len(series_values) == 0: continue
+
+					series_config = {
+						'region':      region_key,
+						'report':      report_key,
+						'code':        series_data['seriesCode'],
+						'name':        series_data['seriesName'],
+						'description': series_data['seriesDescription'] or '',
+						'notes':       series_data['seriesNotes'] or '',
+						'units':       _parseArguments(self._getUnitArguments, series_data['seriesUnits'])['string'],
+						'scale':       _parseArguments(self._getScaleArguments, series_data['seriesScale'])['string'],
+						'strvalues':   '',
+						'binvalues':   None
+					}
+					series_config.update(self._encodeSeriesValues(series_values))
+
+					series_code = series_config['code']
+					if series_code not in definitions:
+						definitions[series_code] = (series_config['name'], series_config['description'], series_config['notes'])
+						definition_rows.append((report_key, series_code) + definitions[series_code])
+					for column, definition_text in zip(['name', 'description', 'notes'], definitions[series_code]):
+						if series_config[column] == definition_text:
+							series_config[column] = ''
+					rows.append(tuple(series_config[i] for i in columns))
+
+				self._executeMany(definition_query, definition_rows)
+				self._executeMany(SEARCH_INSERT_QUERY, [('series',) + i for i in definition_rows])
+				total += self._executeMany(insert_query, rows)
+				self._setImportCheckpoint(report_key, position)
+				self._main_database.commit()
+				pbar.update(position)
+		pbar.finish()
+		self._clearImportCheckpoint(report_key)
+
 		db_size = self.filesize
+		if verbose:
+			print("Added {} regions, {} scales and {} units.".format(
+				len(missing_regions), len(missing_scales), len(missing_units))
+			)
+		print("Inserted {} series.".format(total))
 		print("Size of database: {:.2f} MB".format(db_size))
 		print("Finished in ", timer)
-		if verbose:
-			print("Could not locate these regions: ")
+
+	def _deferIndexes(self, function, *args, **kwargs):
+		""" Runs an import with the secondary indexes removed.
+			Every index that is not part of a primary key or unique constraint is dropped, the
+			import is run, and the indexes are rebuilt once the data is loaded. The statistics
+			used by the query planner are then updated with ANALYZE.
+			Parameters
+			----------
+				function: callable
+					The import method, ex. self.addFromApi
+				*args, **kwargs
+					Passed to `function`.
+			Returns
+			-------
+				dict<str, float>
+					The number of seconds spent in each phase.
+		"""
+		timings = dict()
+		start = time.perf_counter()
+		indexes = self._dropIndexes()
+		timings['dropIndexes'] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		try:
+			function(*args, **kwargs)
+		except:
+			self._createIndexes(indexes)
+			raise
+		timings['load'] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		self._createIndexes(indexes)
+		timings['createIndexes'] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		with db_session:
+			self._main_database.get_connection().execute('ANALYZE')
+		timings['analyze'] = time.perf_counter() - start
+
+		print("Rebuilt {} indexes.".format(len(indexes)))
+		for phase, seconds in timings.items():
+			print("\t{:<15}{:>10.2f}s".format(phase, seconds))
+		return timings
+
+	@db_session
+	def _dropIndexes(self):
+		""" Drops every index created with CREATE INDEX.
+			Returns
+			-------
+				list<tuple<str, str>>
+					The name and sql statement of each dropped index.
+		"""
+		query = "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+		indexes = [
+			(name, sql) for name, sql in self._query(query).fetchall()
+			if not sql.upper().startswith('CREATE UNIQUE')
+		]
+		connection = self._main_database.get_connection()
+		for name, _ in indexes:
+			connection.execute('DROP INDEX "{}"'.format(name))
+		self._main_database.commit()
+		return indexes
+
+	@db_session
+	def _createIndexes(self, indexes):
+		connection = self._main_database.get_connection()
+		for _, sql in indexes:
+			connection.execute(sql)
+		self._main_database.commit()
+
+	def _executeMany(self, query, rows):
+		""" Executes `query` for each row in the current transaction. Returns the number of rows. """
+		if len(rows) != 0:
+			connection = self._main_database.get_connection()
+			connection.executemany(query, rows)
+		return len(rows)
+
+	@staticmethod
+	def _iterateBatches(items, batch_size, start = None, size = None):
+		""" Splits items[start:] into consecutive batches of at least `batch_size` series.
+			Parameters
+			----------
+				items: iterable<>
+					Only iterated over once, so it may be a generator.
+				batch_size: int
+				start: int; default None
+					The position to start from, ex. an import checkpoint.
+				size: callable; default None
+					Returns the number of series in an item. Each item is a single series by default.
+			Yields
+			------
+				position, batch: int, list<>
+					`position` is the index of the first item after the batch.
+		"""
+		batch = list()
+		batch_length = 0
+		position = 0
+		for position, item in enumerate(items, 1):
+			if start and position <= start:
+				continue
+			batch.append(item)
+			batch_length += 1 if size is None else size(item)
+			if batch_length >= batch_size:
+				yield position, batch
+				batch = list()
+				batch_length = 0
+		if batch:
+			yield position, batch
+
+	@staticmethod
+	def _getLength(items):
+		""" Returns the length of `items`, or progressbar.UnknownLength if `items` is an iterator. """
+		return len(items) if hasattr(items, '__len__') else progressbar.UnknownLength
+
+	@db_session
+	def _getImportCheckpoint(self, report_name):
+		""" Returns the position an interrupted import of `report_name` should resume from.
+			None if the report is not being imported.
+		"""
+		connection = self._main_database.get_connection()
+		connection.execute(
+			'CREATE TABLE IF NOT EXISTS "{}" ("report" TEXT NOT NULL PRIMARY KEY, "position" INTEGER NOT NULL)'.format(
+				IMPORT_CHECKPOINT_TABLE
+			)
+		)
+		query = 'SELECT "position" FROM "{}" WHERE "report" = ?'.format(IMPORT_CHECKPOINT_TABLE)
+		row = connection.execute(query, (report_name,)).fetchone()
+		self._main_database.commit()
+		return row[0] if row else None
+
+	def _setImportCheckpoint(self, report_name, position):
+		""" Records the position of an import. Must be called in the transaction that commits the
+			data up to `position`.
+		"""
+		query = 'INSERT OR REPLACE INTO "{}" ("report", "position") VALUES (?, ?)'.format(IMPORT_CHECKPOINT_TABLE)
+		self._main_database.get_connection().execute(query, (report_name, position))
+
+	@db_session
+	def _clearImportCheckpoint(self, report_name):
+		query = 'DELETE FROM "{}" WHERE "report" = ?'.format(IMPORT_CHECKPOINT_TABLE)
+		self._main_database.get_connection().execute(query, (report_name,))
+		self._main_database.commit()
+
+	def _getSeriesColumns(self):
+		""" Returns the columns of the series table, in the order used for bulk inserts. """
+		attributes = [
+			'region', 'report', 'code', 'localname', 'localdescription', 'localnotes', 'units', 'scale', 'strvalues', 'binvalues'
+		]
+		attributes += encoding.SUMMARY_KEYS
+		columns = list()
+		for attribute in attributes:
+			attribute_columns = getattr(self.Series, attribute).columns
+			if len(attribute_columns) != 1:
+				message = "Series.{} is mapped to more than one column: {}".format(attribute, attribute_columns)
+				raise ValueError(message)
+			columns.append(attribute_columns[0])
+		return columns
+
+	@db_session
+	def _getRegionMap(self, namespace):
+		""" Maps every region code and every identifier in `namespace` to the code of its region.
+			Region codes take precedence over identifiers, matching getRegion().
+		"""
+		region_map = {i: i for i in select(r.code for r in self.Region)}
+		identifiers = select((i.string, i.region.code) for i in self.Identifier if i.namespace == namespace)
+		for string, region_code in identifiers:
+			region_map.setdefault(string, region_code)
+		return region_map
+
+	@staticmethod
+	def _getScaleArguments(scale_data):
+		""" Converts the 'seriesScale' of an API response into the arguments of a Scale entity. """
+		if isinstance(scale_data, str):
+			scale_data = {
+				'string': scale_data.lower(),
+				'multiplier': float(numbertools.getMultiplier(scale_data))
+			}
+		return validation.parseEntityArguments('scale', scale_data)
+
+	@staticmethod
+	def _getUnitArguments(unit_data):
+		""" Converts the 'seriesUnits' of an API response into the arguments of a Unit entity. """
+		if isinstance(unit_data, str):
+			unit_data = {
+				'string': unit_data,
+				'code': ''
+			}
+		return validation.parseEntityArguments('unit', unit_data)
 
 	@db_session
 	def getEntity(self, entity_type, key, **kwargs):
@@ -773,6 +1908,190 @@ class RegionDatabase:
 			db_size = 0.0
 
 		return db_size
+	@staticmethod
+	def _selectBatches(query, values):
+		""" Runs a query that filters on a list of values, MAX_QUERY_PARAMETERS values at a time.
+			Parameters
+			----------
+			query: function(list) -> Query
+			values: iterable
+			Returns
+			-------
+			list
+				The combined results.
+		"""
+		values = list(values)
+		result = list()
+		for index in range(0, len(values), MAX_QUERY_PARAMETERS):
+			result += query(values[index:index + MAX_QUERY_PARAMETERS])[:]
+		return result
+
+	@db_session
+	def serialize(self, entities, expand = 1, to_json = False):
+		""" Converts a number of series or regions to dicts, as Series.toDict() and Region.toDict() do.
+			The related entities of every entity are loaded together in a fixed number of queries
+			rather than separately for each entity.
+			Parameters
+			----------
+			entities: list<Series>, list<Region>
+				Every entity must be of the same type.
+			expand: {0, 1}; default 1
+				* 0: Relations are represented by their keys, as with toDict(compact = True).
+				* 1: Series include the compact dicts of their region, report, units and scale.
+					Regions include the keys of their series, identifiers and subregions.
+				The parent of a region is always given by its key, so both forms share a schema.
+			to_json: bool; default False
+				If True, the values of each series are given as (float, float) pairs.
+			Returns
+			-------
+			list<dict>
+		"""
+		if expand not in (0, 1):
+			message = "'{}' is not a valid expansion depth. Expected 0 or 1.".format(expand)
+			raise ValueError(message)
+
+		entities = list(entities)
+		if len(entities) == 0:
+			return list()
+
+		entity_types = {i.entity_type for i in entities}
+		if len(entity_types) != 1:
+			message = "Cannot serialize a mix of entity types: {}".format(sorted(entity_types))
+			raise ValueError(message)
+		entity_type = entity_types.pop()
+		if entity_type == 'series':
+			result = self._serializeSeries(entities, expand, to_json)
+		elif entity_type == 'region':
+			result = self._serializeRegions(entities, expand)
+		else:
+			result = [i.toDict(not expand) for i in entities]
+		return result
+
+	def _serializeSeries(self, series, expand, to_json):
+		regions = self._prefetchRegions({i.region.code for i in series})
+		reports = {i.name: i for i in self._selectBatches(
+			lambda batch: select(r for r in self.Report if r.name in batch), {i.report.name for i in series}
+		)}
+		self._selectBatches(lambda batch: select(a for a in self.Agency if a.name in batch), {i.agency.name for i in reports.values()})
+		self._selectBatches(lambda batch: select(u for u in self.Unit if u.string in batch), {i.units.string for i in series if i.units})
+		self._selectBatches(lambda batch: select(s for s in self.Scale if s.string in batch), {i.scale.string for i in series if i.scale})
+
+		definitions = {
+			(i.report.name, i.code): i for i in
+			self._selectBatches(lambda batch: select(d for d in self.SeriesDefinition if d.report.name in batch), reports)
+		}
+		for entity in series:
+			entity._definition_cache = definitions.get((entity.report.name, entity.code))
+		self.loadValues(series)
+
+		if expand:
+			identifiers = self._prefetchIdentifiers(regions)
+			region_dicts = {i: self._regionToDict(j, identifiers[i]) for i, j in regions.items()}
+			report_dicts = {i: self._reportToDict(j) for i, j in reports.items()}
+
+		result = list()
+		for entity in series:
+			if expand:
+				series_region = region_dicts[entity.region.code]
+				series_report = report_dicts[entity.report.name]
+				series_units = entity.units.toDict() if entity.units else None
+				series_scale = entity.scale.toDict() if entity.scale else None
+			else:
+				series_region = entity.region.key
+				series_report = entity.report.key
+				series_units = entity.units.key if entity.units else None
+				series_scale = entity.scale.key if entity.scale else None
+
+			data = {
+				'entityType':        'series',
+				'entityKey':         entity.key,
+				'seriesRegion':      series_region,
+				'seriesReport':      series_report,
+				'seriesCode':        entity.code,
+				'seriesName':        entity.name,
+				'seriesDescription': entity.description,
+				'seriesNotes':       entity.notes,
+				'seriesUnits':       series_units,
+				'seriesScale':       series_scale,
+				'seriesValues':      entity.fvalues if to_json else entity.values,
+				'seriesTags':        list(),
+			}
+			result.append(data)
+		return result
+
+	def _serializeRegions(self, regions, expand):
+		region_codes = self._prefetchRegions({i.code for i in regions})
+		identifiers = self._prefetchIdentifiers(region_codes)
+		if expand:
+			subregions = {i: list() for i in region_codes}
+			for region in self._selectBatches(lambda batch: select(r for r in self.Region if r.parent.code in batch), region_codes):
+				subregions[region.parent.code].append(region.key)
+
+			region_series = {i: list() for i in region_codes}
+			series_keys = self._selectBatches(
+				lambda batch: select((s.region.code, s.report.name, s.code) for s in self.Series if s.region.code in batch),
+				region_codes
+			)
+			for region_code, report_name, series_code in series_keys:
+				region_series[region_code].append((region_codes[region_code].key, report_name, series_code))
+
+		result = list()
+		for region in regions:
+			if expand:
+				data = self._regionToDict(region, identifiers[region.code], subregions[region.code], region_series[region.code])
+			else:
+				data = self._regionToDict(region, identifiers[region.code])
+			result.append(data)
+		return result
+
+	def _prefetchRegions(self, codes):
+		""" Loads a number of regions and their parents. Returns the regions keyed by region code. """
+		regions = {i.code: i for i in self._selectBatches(lambda batch: select(r for r in self.Region if r.code in batch), codes)}
+		parents = {i.parent.code for i in regions.values() if i.parent} - set(regions)
+		self._selectBatches(lambda batch: select(r for r in self.Region if r.code in batch), parents)
+		return regions
+
+	def _prefetchIdentifiers(self, regions):
+		""" Returns the identifiers of each region, keyed by region code. """
+		identifiers = {i: list() for i in regions}
+		for identifier in self._selectBatches(lambda batch: select(i for i in self.Identifier if i.region.code in batch), regions):
+			identifiers[identifier.region.code].append(identifier)
+		return identifiers
+
+	@staticmethod
+	def _regionToDict(region, identifiers, subregions = None, series = None):
+		""" Region.toDict() using preloaded relations. The compact form is used if `subregions` is None. """
+		compact = subregions is None
+		data = {
+			'entityType':        'region',
+			'entityKey':         region.key,
+			'regionType':        region.type,
+			'regionName':        region.name,
+
+			# Relations
+			'regionIdentifiers': [i.string if compact else i.key for i in identifiers],
+			'regionParent':      region.parent.key if region.parent else None,
+			'regionSubregions':  list() if compact else subregions,
+			'regionSeries':      list() if compact else series,
+			'regionTags':        list()
+		}
+		return data
+
+	@staticmethod
+	def _reportToDict(report):
+		""" Report.toDict() using a preloaded agency. """
+		data = {
+			'entityType':   'report',
+			'reportName':   report.name,
+			'reportCode':   report.code,
+			'reportUrl':    report.url,
+			'reportDate':   report.date,
+			'data':         list(),
+			'reportAgency': report.agency.toDict(True),
+			'reportTags':   list()
+		}
+		return data
+
 	@db_session
 	def toDict(self, entity_type, key, expand = 1, **kwargs):
 		entity = self.getEntity(entity_type, key)
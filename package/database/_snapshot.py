@@ -0,0 +1,483 @@
+""" A read-only copy of a region database that can be opened without Pony or SQLite.
+	compileSnapshot() writes every region, identifier and series of a database to a single file,
+	and RegionSnapshot memory-maps it so only the parts that are used are read from disk. This
+	makes it suitable for read-only workers, which would otherwise map every entity with Pony
+	before they could answer a single request.
+
+	The file is made of numpy arrays laid out one after the other:
+		* 8 bytes: SNAPSHOT_MAGIC
+		* 8 bytes: The length of the header, as a little-endian uint64.
+		* The header: json with the dtype, shape and offset of each array.
+		* The arrays, each aligned to SNAPSHOT_ALIGNMENT bytes.
+	Codes used for lookups are saved as sorted fixed-width unicode arrays so they can be
+	searched with numpy.searchsorted(). Other text is saved as utf-8 bytes with an offset array.
+"""
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy
+import pandas
+from pony.orm import MultipleObjectsFoundError
+
+from ..utilities import encoding
+from ._export import _connect, _getValueColumns, _hasTable
+from ._region_database import RegionDatabase, RegionMapping, standard_datasets
+
+SNAPSHOT_MAGIC = b'RGNSNAP\x01'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGNMENT = 64
+
+# The number of array elements copied into the snapshot at a time.
+WRITE_CHUNK_SIZE = 1024**2
+
+
+class SnapshotRegion(namedtuple('SnapshotRegion', ['code', 'name', 'type', 'parent'])):
+	""" A region read from a snapshot. `parent` is the code of the parent region, if any. """
+	__slots__ = ()
+	entity_type = 'region'
+
+	@property
+	def key(self):
+		return self.name
+
+
+class SnapshotSeries(namedtuple(
+	'SnapshotSeries', ['region', 'report', 'code', 'name', 'description', 'notes', 'units', 'scale', 'years', 'values']
+)):
+	""" A series read from a snapshot. `region` and `report` are the region code and report name.
+		`years` and `values` are read-only views of the snapshot file.
+	"""
+	__slots__ = ()
+	entity_type = 'series'
+
+	@property
+	def arrays(self):
+		""" Matches Series.arrays. """
+		return self.years, self.values
+
+	@property
+	def key(self):
+		return (self.region, self.report, self.code)
+
+
+def _packStrings(strings):
+	""" Encodes a list of strings as utf-8 bytes and the offset of each string. """
+	encoded = [(i or '').encode('utf-8') for i in strings]
+	offsets = numpy.zeros(len(encoded) + 1, dtype = numpy.int64)
+	numpy.cumsum([len(i) for i in encoded], out = offsets[1:])
+	data = numpy.frombuffer(b''.join(encoded), dtype = numpy.uint8)
+	return offsets, data
+
+
+def _toUnicode(strings):
+	""" Converts a list of strings to a fixed-width unicode array. Empty lists still need a width. """
+	return numpy.array(strings, dtype = str) if len(strings) else numpy.zeros(0, dtype = 'U1')
+
+
+def _loadSpilledArray(filename, dtype):
+	""" Memory-maps the values written to a temporary file by _readSnapshotArrays(). """
+	if os.path.getsize(filename) == 0:
+		return numpy.zeros(0, dtype = dtype)
+	return numpy.memmap(filename, dtype = dtype, mode = 'r')
+
+
+def _readSnapshotArrays(connection, batch_size, folder):
+	""" Reads the database into the arrays saved in the snapshot.
+		The years and values of the series are written to temporary files in `folder` one batch
+		at a time and memory-mapped, so they are never held in memory all at once.
+	"""
+	arrays = dict()
+
+	regions = connection.execute('SELECT "code", "name", "type", "parent" FROM "Region" ORDER BY "code"').fetchall()
+	region_index = {row[0]: index for index, row in enumerate(regions)}
+	arrays['region.code'] = _toUnicode([i[0] for i in regions])
+	arrays['region.name.offsets'], arrays['region.name'] = _packStrings([i[1] for i in regions])
+	arrays['region.type'] = _toUnicode([i[2] for i in regions])
+	arrays['region.parent'] = numpy.array([region_index.get(i[3], -1) for i in regions], dtype = numpy.int32)
+
+	identifiers = connection.execute(
+		'SELECT i."string", n."code", i."region" FROM "Identifier" i JOIN "Namespace" n ON n."name" = i."namespace" '
+		'ORDER BY i."string", n."code"'
+	).fetchall()
+	arrays['identifier.string'] = _toUnicode([i[0] for i in identifiers])
+	arrays['identifier.namespace'] = _toUnicode([i[1] for i in identifiers])
+	arrays['identifier.region'] = numpy.array([region_index[i[2]] for i in identifiers], dtype = numpy.int32)
+
+	reports = [i[0] for i in connection.execute('SELECT "name" FROM "Report" ORDER BY "name"')]
+	report_index = {name: index for index, name in enumerate(reports)}
+	arrays['report.name'] = _toUnicode(reports)
+
+	# Series are grouped by code and report, and sorted by region within each group.
+	definitions = dict()
+	if _hasTable(connection, 'SeriesDefinition'):
+		definitions = {
+			(report, code): (name, description, notes)
+			for report, code, name, description, notes in
+			connection.execute('SELECT "report", "code", "name", "description", "notes" FROM "SeriesDefinition"')
+		}
+	cursor = connection.execute(
+		'SELECT s."code", s."report", s."region", s."name", s."description", s."notes", s."units", s."scale", {} '
+		'FROM "Series" s ORDER BY s."code", s."report", s."region"'.format(_getValueColumns(connection))
+	)
+	groups = list()
+	group_offsets = [0]
+	series_columns = {'region': list(), 'name': list(), 'description': list(), 'notes': list(), 'units': list(), 'scale': list()}
+	value_offsets = [numpy.zeros(1, dtype = numpy.int64)]
+	years_filename = os.path.join(folder, 'years')
+	values_filename = os.path.join(folder, 'values')
+	with open(years_filename, 'wb') as years_file, open(values_filename, 'wb') as values_file:
+		while True:
+			rows = cursor.fetchmany(batch_size)
+			if len(rows) == 0:
+				break
+			for code, report, region, name, description, notes, units, scale, _, _ in rows:
+				if len(groups) == 0 or groups[-1] != (code, report):
+					if len(groups) != 0:
+						group_offsets.append(len(series_columns['region']))
+					groups.append((code, report))
+				definition = definitions.get((report, code), (None, None, None))
+				series_columns['region'].append(region_index[region])
+				series_columns['name'].append(name or definition[0])
+				series_columns['description'].append(description or definition[1])
+				series_columns['notes'].append(notes or definition[2])
+				series_columns['units'].append(units)
+				series_columns['scale'].append(scale)
+
+			offsets, batch_years, batch_values = encoding.decodeValues([(i[8], i[9]) for i in rows])
+			value_offsets.append(offsets[1:] + value_offsets[-1][-1])
+			years_file.write(batch_years.astype(encoding.YEAR_DTYPE, copy = False).tobytes())
+			values_file.write(batch_values.astype(encoding.VALUE_DTYPE, copy = False).tobytes())
+	group_offsets.append(len(series_columns['region']))
+
+	arrays['group.code'] = _toUnicode([i[0] for i in groups])
+	arrays['group.report'] = numpy.array([report_index[i[1]] for i in groups], dtype = numpy.int32)
+	arrays['group.offsets'] = numpy.array(group_offsets if groups else [0], dtype = numpy.int64)
+	arrays['series.region'] = numpy.array(series_columns['region'], dtype = numpy.int32)
+	for column in ['name', 'description', 'notes', 'units', 'scale']:
+		arrays['series.{}.offsets'.format(column)], arrays['series.{}'.format(column)] = _packStrings(series_columns[column])
+	arrays['series.offsets'] = numpy.concatenate(value_offsets)
+	arrays['series.years'] = _loadSpilledArray(years_filename, encoding.YEAR_DTYPE)
+	arrays['series.values'] = _loadSpilledArray(values_filename, encoding.VALUE_DTYPE)
+
+	return arrays
+
+
+def _writeSnapshot(arrays, output):
+	""" Writes the arrays to `output`. See the module docstring for the layout. """
+	header = {'version': SNAPSHOT_VERSION, 'arrays': dict()}
+	offset = 0
+	for name, array in arrays.items():
+		offset += -offset % SNAPSHOT_ALIGNMENT
+		header['arrays'][name] = [array.dtype.str, list(array.shape), offset]
+		offset += array.nbytes
+
+	# The offsets above are relative to the end of the header, which is padded to the alignment.
+	encoded_header = json.dumps(header).encode('utf-8')
+	start = len(SNAPSHOT_MAGIC) + 8 + len(encoded_header)
+	encoded_header += b' ' * (-start % SNAPSHOT_ALIGNMENT)
+	start += -start % SNAPSHOT_ALIGNMENT
+
+	with open(output, 'wb') as file1:
+		file1.write(SNAPSHOT_MAGIC)
+		file1.write(numpy.array(len(encoded_header), dtype = '<u8').tobytes())
+		file1.write(encoded_header)
+		for name, array in arrays.items():
+			file1.seek(start + header['arrays'][name][2])
+			for index in range(0, len(array), WRITE_CHUNK_SIZE):
+				file1.write(numpy.ascontiguousarray(array[index:index + WRITE_CHUNK_SIZE]).tobytes())
+		# Empty arrays at the end of the file still need their offsets to be within the file.
+		file1.truncate(start + offset)
+
+
+def compileSnapshot(filename, output = None, batch_size = 10000):
+	""" Writes a read-only snapshot of a database. See RegionSnapshot.
+		Parameters
+		----------
+		filename: str
+			Path to the sqlite file or the name of a standard dataset ('global', 'europe', 'test').
+		output: str; default None
+			Defaults to the database filename with the extension '.snapshot'.
+		batch_size: int; default 10000
+			The number of series decoded at a time.
+		Returns
+		-------
+		str
+			The path to the snapshot.
+	"""
+	filename = standard_datasets.get(filename, filename)
+	if not os.path.exists(filename):
+		message = "'{}' does not exist.".format(filename)
+		raise FileNotFoundError(message)
+	if output is None:
+		output = os.path.splitext(filename)[0] + '.snapshot'
+
+	start = time.perf_counter()
+	output_folder = os.path.dirname(os.path.abspath(output))
+	with tempfile.TemporaryDirectory(dir = output_folder, ignore_cleanup_errors = True) as folder:
+		connection = _connect(filename)
+		try:
+			arrays = _readSnapshotArrays(connection, batch_size, folder)
+		finally:
+			connection.close()
+		region_count, series_count = len(arrays['region.code']), len(arrays['series.region'])
+
+		# Written to a temporary file first so readers never open a partially written snapshot.
+		temporary_filename = os.path.join(folder, 'snapshot')
+		_writeSnapshot(arrays, temporary_filename)
+		# The memory-mapped values must be closed before the temporary folder is removed.
+		del arrays
+		os.replace(temporary_filename, output)
+
+	print("Saved {} regions and {} series to {} in {:.1f} seconds.".format(
+		region_count, series_count, output, time.perf_counter() - start
+	))
+	return output
+
+
+class RegionSnapshot:
+	""" Reads a snapshot written by compileSnapshot(). Supports the read-only queries of RegionDatabase
+		with the same arguments, but returns SnapshotRegion and SnapshotSeries rather than entities.
+	"""
+	def __init__(self, filename):
+		"""
+			Parameters
+			----------
+			filename: str
+				Path to the snapshot, or to a database with a snapshot saved next to it.
+		"""
+		if not filename.endswith('.snapshot'):
+			filename = os.path.splitext(standard_datasets.get(filename, filename))[0] + '.snapshot'
+		self.filename = filename
+		self._arrays = self._loadArrays(filename)
+
+	@staticmethod
+	def _loadArrays(filename):
+		buffer = numpy.memmap(filename, dtype = numpy.uint8, mode = 'r')
+		if bytes(buffer[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+			message = "'{}' is not a region snapshot.".format(filename)
+			raise ValueError(message)
+
+		position = len(SNAPSHOT_MAGIC)
+		header_length = int(buffer[position:position + 8].view('<u8')[0])
+		position += 8
+		header = json.loads(bytes(buffer[position:position + header_length]).decode('utf-8'))
+		if header['version'] != SNAPSHOT_VERSION:
+			message = "'{}' was written by a different version of compileSnapshot(). Compile it again.".format(filename)
+			raise ValueError(message)
+		start = position + header_length
+
+		arrays = dict()
+		for name, (dtype, shape, offset) in header['arrays'].items():
+			arrays[name] = numpy.ndarray(tuple(shape), dtype = numpy.dtype(dtype), buffer = buffer, offset = start + offset)
+		return arrays
+
+	def _getString(self, name, index):
+		offsets = self._arrays[name + '.offsets']
+		return bytes(self._arrays[name][offsets[index]:offsets[index + 1]]).decode('utf-8')
+
+	@staticmethod
+	def _find(array, key):
+		""" Returns the position of `key` in a sorted array, or None. """
+		index = numpy.searchsorted(array, key)
+		if index < len(array) and array[index] == key:
+			return int(index)
+		return None
+
+	def _resolveRegion(self, key, namespace_code):
+		""" Returns the position of the region matching `key`, or None. See RegionDatabase.resolveRegions(). """
+		index = self._find(self._arrays['region.code'], key)
+		if index is not None:
+			return index
+
+		strings = self._arrays['identifier.string']
+		left, right = numpy.searchsorted(strings, key, 'left'), numpy.searchsorted(strings, key, 'right')
+		regions = self._arrays['identifier.region'][left:right]
+		if namespace_code is not None:
+			regions = regions[self._arrays['identifier.namespace'][left:right] == namespace_code]
+
+		unique_regions = numpy.unique(regions)
+		if len(unique_regions) == 0:
+			return None
+		if len(unique_regions) > 1:
+			message = "'{}' identifies more than one region. Specify the namespace to search through.".format(key)
+			raise MultipleObjectsFoundError(message)
+		return int(unique_regions[0])
+
+	def _toRegion(self, index):
+		parent = self._arrays['region.parent'][index]
+		region = SnapshotRegion(
+			code = str(self._arrays['region.code'][index]),
+			name = self._getString('region.name', index),
+			type = str(self._arrays['region.type'][index]),
+			parent = None if parent < 0 else str(self._arrays['region.code'][parent])
+		)
+		return region
+
+	def _toSeries(self, index, group):
+		start, end = self._arrays['series.offsets'][index:index + 2]
+		series = SnapshotSeries(
+			region = str(self._arrays['region.code'][self._arrays['series.region'][index]]),
+			report = str(self._arrays['report.name'][self._arrays['group.report'][group]]),
+			code = str(self._arrays['group.code'][group]),
+			name = self._getString('series.name', index),
+			description = self._getString('series.description', index),
+			notes = self._getString('series.notes', index),
+			units = self._getString('series.units', index),
+			scale = self._getString('series.scale', index),
+			years = self._arrays['series.years'][start:end],
+			values = self._arrays['series.values'][start:end]
+		)
+		return series
+
+	def _getGroups(self, key, report = None):
+		""" Returns the positions of the groups of series with the code `key`, optionally limited to one report. """
+		codes = self._arrays['group.code']
+		groups = numpy.arange(numpy.searchsorted(codes, key, 'left'), numpy.searchsorted(codes, key, 'right'))
+		if report is not None:
+			if not isinstance(report, str):
+				report = report.name
+			report_index = self._find(self._arrays['report.name'], report)
+			groups = groups[self._arrays['group.report'][groups] == report_index]
+		return groups
+
+	def _getRegionMask(self, region_indexes, region_type = None, namespace = None):
+		""" Returns a mask of the regions with the given type and/or an identifier in the given namespace. """
+		mask = numpy.ones(len(region_indexes), dtype = bool)
+		if region_type is not None:
+			mask &= self._arrays['region.type'][region_indexes] == region_type
+		if namespace is not None:
+			namespace_regions = self._arrays['identifier.region'][self._arrays['identifier.namespace'] == namespace]
+			mask &= numpy.isin(region_indexes, namespace_regions)
+		return mask
+
+	def resolveRegions(self, keys, namespace = None):
+		""" See RegionDatabase.resolveRegions(). """
+		namespace_code = namespace if namespace is None or isinstance(namespace, str) else namespace.code
+		result = list()
+		for key in keys:
+			index = self._resolveRegion(key, namespace_code)
+			result.append(None if index is None else str(self._arrays['region.code'][index]))
+		return result
+
+	def getRegion(self, key, namespace = None):
+		""" See RegionDatabase.getRegion().
+			Returns
+			-------
+			SnapshotRegion, None
+		"""
+		if not isinstance(key, str):
+			key = key.code
+		namespace_code = namespace if namespace is None or isinstance(namespace, str) else namespace.code
+		index = self._resolveRegion(key, namespace_code)
+		return None if index is None else self._toRegion(index)
+
+	def getRegions(self, keys, namespace = None):
+		""" See RegionDatabase.getRegions().
+			Returns
+			-------
+			RegionMapping
+		"""
+		result = RegionMapping()
+		for key in keys:
+			region = self.getRegion(key, namespace)
+			if region is None:
+				result.missing.append(key)
+			else:
+				result[key] = region
+		return result
+
+	def getSeries(self, region, key, report = None):
+		""" See RegionDatabase.getSeries().
+			Parameters
+			----------
+			region: str, SnapshotRegion
+			key: str
+				The code of the series.
+			report: str; default None
+				Only required if more than one report has a series with this code for the region.
+			Returns
+			-------
+			SnapshotSeries, None
+		"""
+		region = self.getRegion(region)
+		if region is None:
+			return None
+		region_index = self._find(self._arrays['region.code'], region.code)
+
+		matches = list()
+		for group in self._getGroups(key, report):
+			start, end = self._arrays['group.offsets'][group:group + 2]
+			index = self._find(self._arrays['series.region'][start:end], region_index)
+			if index is not None:
+				matches.append((start + index, group))
+
+		if len(matches) > 1:
+			message = "Multiple reports have the series '{}' for '{}'. Specify the report.".format(key, region.code)
+			raise MultipleObjectsFoundError(message)
+		return self._toSeries(*matches[0]) if matches else None
+
+	def getPanel(self, report, key, regions = None, region_type = None, namespace = None):
+		""" See RegionDatabase.getPanel(). Raises ValueError if `report` is None and more than one
+			report has the series.
+		"""
+		if namespace is not None and not isinstance(namespace, str):
+			namespace = namespace.code
+
+		groups = self._getGroups(key, report)
+		if len(groups) > 1:
+			reports = sorted(str(self._arrays['report.name'][i]) for i in self._arrays['group.report'][groups])
+			message = "Multiple reports have the series '{}': {}. Specify the report.".format(key, reports)
+			raise ValueError(message)
+		if len(groups) == 0:
+			series = numpy.zeros(0, dtype = numpy.int64)
+		else:
+			start, end = self._arrays['group.offsets'][groups[0]:groups[0] + 2]
+			series = numpy.arange(start, end)
+
+		series_regions = self._arrays['series.region'][series]
+		if regions is None:
+			is_selected = self._getRegionMask(series_regions, region_type, namespace)
+		else:
+			# Requested regions excluded by `region_type` or `namespace` are dropped, as in RegionDatabase.
+			requested = OrderedDict.fromkeys(i for i in self.resolveRegions(regions, namespace) if i is not None)
+			requested = numpy.searchsorted(self._arrays['region.code'], list(requested)).astype(numpy.int32)
+			requested = requested[self._getRegionMask(requested, region_type, namespace)]
+			is_selected = numpy.isin(series_regions, requested)
+		series, series_regions = series[is_selected], series_regions[is_selected]
+
+		# Gathers the values of the selected series without looping over them.
+		starts = self._arrays['series.offsets'][series]
+		lengths = self._arrays['series.offsets'][series + 1] - starts
+		offsets = numpy.zeros(len(series) + 1, dtype = numpy.int64)
+		numpy.cumsum(lengths, out = offsets[1:])
+		positions = numpy.repeat(starts - offsets[:-1], lengths) + numpy.arange(offsets[-1])
+		years = self._arrays['series.years'][positions]
+		values = self._arrays['series.values'][positions]
+
+		region_codes = self._arrays['region.code'][series_regions].tolist()
+		panel = RegionDatabase._toPanel(region_codes, offsets, years, values)
+
+		if regions is not None:
+			panel = panel.reindex(self._arrays['region.code'][requested].tolist())
+
+		return panel
+
+	def getCrossSection(self, report, key, year, method = 'interpolate', **kwargs):
+		""" See RegionDatabase.getCrossSection(). """
+		panel = self.getPanel(report, key, **kwargs)
+		values = RegionDatabase._interpolatePanel(panel.values, panel.columns.values, year, method)
+		return pandas.Series(values, index = panel.index, name = year)
+
+
+if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser(description = "Compiles a read-only snapshot of a region database.")
+	parser.add_argument('filename')
+	parser.add_argument('output', nargs = '?', default = None)
+	arguments = parser.parse_args()
+
+	compileSnapshot(arguments.filename, arguments.output)
@@ -1,5 +1,7 @@
+import functools
 import math
 import datetime
+import numpy
 import pandas
 from scipy.interpolate import interp1d
 from ....github import timetools
@@ -14,44 +16,123 @@ def _toScalar(x):
 
 	return value
 
+@functools.lru_cache(maxsize = 4096)
+def _toYear(date):
+	""" Converts a date to a fractional year. Series usually share the same few dates, so recent
+		conversions are reused.
+	"""
+	return date.toYear()
+
 class DataSeries:
 	""" Sets up common operations on a Series instance. Defines all required properties that
 		every subsequent Series entity must implement. 
+
+		Only the years and scaled values are saved when the series is created, as numpy arrays.
+		The pandas.Series and the lists of values are built the first time they are used.
 	"""
+	__slots__ = (
+		'data', 'multiplier', '_years', '_values',
+		'_series', '_x', '_y', '_fx', '_ix', '_values_list', '_fvalues', '_interpolation_cache',
+		'_year_index', '_date_index', '_sorted_arrays'
+	)
 	entity_type = 'series'
 
 	def __init__(self, data, israw = True):
 		self._verifyData(data)
 
 		multiplier = data['seriesScale']['scaleMultiplier']
-		values = [(i, j if not israw else j * multiplier) for i, j in data['seriesValues']]
-		x, y = zip(*values)
-		fx = [i.toYear() for i in x]
-		ix = [int(i) for i in fx]
-		region_key = data['seriesRegion']['entityKey']
-		series = pandas.Series(index = x, data = y, name = region_key)
-
-		self.series = series
+		series_values = data['seriesValues']
+		years = numpy.array([_toYear(i) for i, _ in series_values], dtype = numpy.float64)
+		values = numpy.array([j for _, j in series_values], dtype = numpy.float64)
+		if israw:
+			values *= multiplier
+
 		self.data = data
 		self.multiplier = multiplier
-		self.values = values
-		self.x, self.y = x, y
-		self.fx, self.ix = fx, ix
-
-		self.fvalues = [(i.toYear(), j) for i,j in self.data['seriesValues']]
+		self._years = years
+		self._values = values
+
+		# __getattr__ forwards missing attributes to the pandas series, so every slot is set here.
+		self._series = None
+		self._x = None
+		self._y = None
+		self._fx = None
+		self._ix = None
+		self._values_list = None
+		self._fvalues = None
 		self._interpolation_cache = None
+		self._year_index = None
+		self._date_index = None
+		self._sorted_arrays = None
 
 	def __getattr__(self, item):
-
+		if item.startswith('_'):
+			raise AttributeError(item)
 		return getattr(self.series, item)
 
+	@property
+	def arrays(self):
+		""" Returns tuple<numpy.ndarray<float64>, numpy.ndarray<float64>>
+			The year of each value as a fraction of the year, and the scaled values.
+		"""
+		return self._years, self._values
+
+	@property
+	def series(self):
+		""" pandas.Series: The scaled values indexed by date. """
+		if self._series is None:
+			region_key = self.data['seriesRegion']['entityKey']
+			self._series = pandas.Series(index = self.x, data = self._values, name = region_key)
+		return self._series
+
+	@property
+	def x(self):
+		""" tuple: The date of each value, as given. """
+		if self._x is None:
+			self._x = tuple(i for i, _ in self.data['seriesValues'])
+		return self._x
+
+	@property
+	def y(self):
+		""" tuple<float>: The scaled values. """
+		if self._y is None:
+			self._y = tuple(self._values.tolist())
+		return self._y
+
+	@property
+	def fx(self):
+		""" list<float>: The date of each value as a fraction of the year. """
+		if self._fx is None:
+			self._fx = self._years.tolist()
+		return self._fx
+
+	@property
+	def ix(self):
+		""" list<int>: The year of each value. """
+		if self._ix is None:
+			self._ix = self._years.astype(numpy.int64).tolist()
+		return self._ix
+
+	@property
+	def values(self):
+		""" list<tuple>: The date and scaled value of each point. """
+		if self._values_list is None:
+			self._values_list = list(zip(self.x, self.y))
+		return self._values_list
+
+	@property
+	def fvalues(self):
+		""" list<tuple<float, float>>: The fractional year and the unscaled value of each point. """
+		if self._fvalues is None:
+			self._fvalues = list(zip(self.fx, [j for _, j in self.data['seriesValues']]))
+		return self._fvalues
 
 	def __str__(self):
 		region_name = self.data['seriesRegion']['regionName']
 
 		series_code = self.data['seriesCode']
-		min_year = int(min(self.x).toYear())
-		max_year = int(max(self.x).toYear())
+		min_year = int(self._years.min())
+		max_year = int(self._years.max())
 
 		string = "Series('{}', [{}, {}], '{}')".format(series_code, min_year, max_year, region_name)
 		return string
@@ -78,19 +159,19 @@ class DataSeries:
 
 		fx = _toScalar(x)
 
-		_minimum_x = min(self.fx)
-		_maximum_x = max(self.fx)
+		_minimum_x = self._years.min()
+		_maximum_x = self._years.max()
 
 		if self._interpolation_cache is None:
 
-			if len(self.x) == 1:
-				self._interpolation_cache = lambda s: self.y[0]
+			if len(self._years) == 1:
+				self._interpolation_cache = lambda s: self._values[0]
 			else:
 				self._interpolation_cache = interp1d(
-					self.fx,
-					self.y,
+					self._years,
+					self._values,
 					bounds_error = False,
-					fill_value = (self.y[0], self.y[-1])
+					fill_value = (self._values[0], self._values[-1])
 				)
 
 		if _minimum_x <= fx <= _maximum_x:
@@ -124,40 +205,26 @@ class DataSeries:
 
 
 	def getValue(self, x, method = 'interpolate', default = math.nan):
-		""" Returns the `y` value at `x`. Interpolation is supported.
+		""" Returns the `y` value at `x`. Interpolation is supported. Missing values are skipped.
 			Parameters
 			----------
 			x: int, float, datetime.date, Timestamp
-				The x-value to use when calculating the y-value
+				The x-value to use when calculating the y-value. Integer years match any value
+				within that year.
 
 			method: {'interpolate', 'inner', 'exact'}
-				* 'interpolate': interpolates and extrapolates over all values of 'x'
+				* 'interpolate': interpolates between all values of 'x'. Values before or after
+					the series are given the first or last value of the series.
 				* 'inner': only interpolates the series between min(x) and max(x)
 				* 'exact': returns the exact value saved for the given 'x' value.
 			default: scalar; default math.nan
 				Default value to return if the requested value cannot be found.
 		"""
+		if not isinstance(x, int):
+			x = _toScalar(x)
+		value = float(self.getYearValues([x], method, numpy.nan)[0])
 
-
-		x_index = self.getIndex(x)
-
-		if x_index and isinstance(x_index, int):
-
-			value = self.y[x_index]
-		elif x_index:
-			value = self.series.get(x_index)
-		else:
-			value = None
-
-		if value is not None and math.isnan(value):
-			value = None
-
-		if value or method == 'exact':
-			pass
-		else:
-			value = self.getInterpolatedValue(x, default = None)
-
-		if value is None:
+		if math.isnan(value):
 			value = default
 
 		return value
@@ -194,18 +261,70 @@ class DataSeries:
 			_values.append((y,v))
 		return _values
 
+	def getYearValues(self, years, method = 'interpolate', default = math.nan):
+		""" Returns the values at a number of years at once, as getValue() does for a single year.
+			Parameters
+			----------
+			years: list<int>, list<float>, numpy.ndarray
+				Integer years match any value within that year, as in getIndex().
+			method: {'interpolate', 'inner', 'exact'}
+				See getValue().
+			default: scalar; default math.nan
+			Returns
+			-------
+			numpy.ndarray<float64>
+		"""
+		if method not in {'interpolate', 'inner', 'exact'}:
+			message = "'{}' is not a valid method. Expected one of 'interpolate', 'inner', 'exact'.".format(method)
+			raise ValueError(message)
+
+		years = numpy.asarray(years)
+		sorted_years, sorted_values = self._getSortedArrays()
+		if len(sorted_years) == 0:
+			return numpy.full(years.shape, default, dtype = numpy.float64)
+
+		# Exact matches are found with a binary search, as the years are sorted.
+		keys = numpy.floor(sorted_years) if years.dtype.kind in 'iu' else sorted_years
+		positions = numpy.minimum(numpy.searchsorted(keys, years), len(keys) - 1)
+		is_exact = keys[positions] == years
+
+		if method == 'exact':
+			result = numpy.full(years.shape, default, dtype = numpy.float64)
+		else:
+			result = numpy.interp(years, sorted_years, sorted_values)
+			if method == 'inner':
+				is_outside = (years < sorted_years[0]) | (years > sorted_years[-1])
+				result[is_outside] = default
+		result[is_exact] = sorted_values[positions[is_exact]]
+
+		return result
+
+	def _getSortedArrays(self):
+		""" Returns the years and values without missing values, sorted by year. """
+		if self._sorted_arrays is None:
+			is_valid = ~numpy.isnan(self._values)
+			order = numpy.argsort(self._years[is_valid], kind = 'stable')
+			self._sorted_arrays = (self._years[is_valid][order], self._values[is_valid][order])
+		return self._sorted_arrays
+
+	def _getYearIndexes(self):
+		""" Returns dict<int, int>, dict<float, int>
+			The position of the first value in each year, and of each fractional year.
+		"""
+		if self._year_index is None:
+			self._year_index = dict()
+			self._date_index = dict()
+			for position, (year, date) in enumerate(zip(self.ix, self.fx)):
+				self._year_index.setdefault(year, position)
+				self._date_index.setdefault(date, position)
+		return self._year_index, self._date_index
+
 	def getIndex(self, date):
 		""" Retrieves a single value for the timestamp indicated by 'index'"""
 		if isinstance(date, int):
-			if date in self.ix:
-				index = self.ix.index(date)
-			else:
-				index = None
+			index = self._getYearIndexes()[0].get(date)
 		elif isinstance(date, float):
-			if date in self.fx:
-				index = self.fx.index(date)
-			else:
-				index = None
+			index = self._getYearIndexes()[1].get(date)
 		elif date in self.series.index:
 			index = date
 		else:
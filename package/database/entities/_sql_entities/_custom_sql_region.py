@@ -1,3 +1,4 @@
+from pony.orm import exists, select
 
 
 class CustomSqlRegion:
@@ -17,7 +18,13 @@ class CustomSqlRegion:
 				series: Series
 		"""
 
-		result = self.series.select(lambda s: s.code == string or s.name == string)
+		# Series only save their name if it differs from the series definition.
+		definitions = self._database_.SeriesDefinition
+		result = select(
+			s for s in self.series if s.code == string or s.localname == string or exists(
+				d for d in definitions if d.report == s.report and d.code == s.code and d.name == string and s.localname == ''
+			)
+		)
 		if report:
 			result = result.filter(lambda s: s.report.name == report or s.report.code == report)
 		result = result.first()
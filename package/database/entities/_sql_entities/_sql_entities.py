@@ -1,15 +1,29 @@
-from pony.orm import Optional, PrimaryKey, Required, Set, db_session
+from pony.orm import Optional, PrimaryKey, Required, Set, composite_index, db_session
 from ._custom_sql_region import CustomSqlRegion
 from package.github import timetools
+from package.utilities import encoding
+from package.utilities.cache import VALUE_CACHE
+
+_year_timestamps = dict()
+
+
+def _getYearTimestamp(year):
+	""" Returns the Timestamp for the first day of `year`. Timestamps are shared between series. """
+	timestamp = _year_timestamps.get(year)
+	if timestamp is None:
+		timestamp = _year_timestamps[year] = timetools.Timestamp('{}-01-01'.format(year))
+	return timestamp
 
 
 @db_session
-def importDatabaseEntities(db):
+def importDatabaseEntities(db, database_key = None):
 	""" Defines the structure of the database.
 		Parameters
 		----------
 		db: pony.orm.Database 
 			The database object to insert the entities into.
+		database_key: str; default None
+			Identifies the database in the process-wide cache of series values.
 	"""
 
 	class Region(db.Entity, CustomSqlRegion):
@@ -105,6 +119,7 @@ def importDatabaseEntities(db):
 		url = Required(str)
 		date = Required(str)
 		data = Set('Series')
+		definitions = Set('SeriesDefinition')
 		agency = Required('Agency')
 		tags = Set('Tag')
 		entity_type = 'report'
@@ -138,24 +153,78 @@ def importDatabaseEntities(db):
 
 			return data
 
-	class Series(db.Entity):
-		region = Required(Region)
+	class SeriesDefinition(db.Entity):
+		""" The text shared by the series of every region with the same report and code. """
 		report = Required(Report)
 		code = Required(str)
 		name = Required(str)
 		description = Optional(str)
 		notes = Optional(str)
+		PrimaryKey(report, code)
+		entity_type = 'definition'
+
+		@property
+		def key(self):
+			return (self.report.key, self.code)
+
+		@db_session
+		def toDict(self, compact = False):
+			data = {
+				'entityType':        'definition',
+				'entityKey':         self.key,
+				'seriesReport':      self.report.key if compact else self.report.toDict(True),
+				'seriesCode':        self.code,
+				'seriesName':        self.name,
+				'seriesDescription': self.description,
+				'seriesNotes':       self.notes
+			}
+			return data
+
+	class Series(db.Entity):
+		region = Required(Region)
+		report = Required(Report)
+		code = Required(str)
+
+		# Only saved if the text differs from the series definition. See Series.name.
+		localname = Optional(str, column = 'name')
+		localdescription = Optional(str, column = 'description')
+		localnotes = Optional(str, column = 'notes')
 
 		units = Optional('Unit')
 		scale = Optional('Scale')
 
-		strvalues = Required(str)
+		strvalues = Optional(str)
+		binvalues = Optional(bytes)
+
+		# Summary statistics of the values. See encoding.summarizeValues().
+		firstyear = Optional(int, index = True)
+		lastyear = Optional(int, index = True)
+		points = Optional(int)
+		minimum = Optional(float, index = True)
+		maximum = Optional(float, index = True)
+		latest = Optional(float, index = True)
+		checksum = Optional(str, nullable = True, index = True)
+
 		tags = Set('Tag')
 		PrimaryKey(region, report, code)
+		# Covers the catalogue query in RegionDatabase.iterateCatalogue().
+		composite_index(report, code, firstyear, lastyear)
 		entity_type = 'series'
+		_cache_database = database_key
+
+		def _unpackValues(self):
+			""" Returns the years and values saved in `binvalues` as read-only numpy arrays. """
+			return encoding.unpackValues(self.binvalues)
 
 		def _splitStringValues(self):
 			string_values = self.strvalues
+			try:
+				_, years, values = encoding.decodeStringValues([string_values], strict = True)
+			except ValueError:
+				# At least one of the dates is not the start of a year.
+				pass
+			else:
+				return [(_getYearTimestamp(i), j) for i, j in zip(years.tolist(), values.tolist())]
 
 			nvalues = list()
 			for element in string_values.split('||'):
@@ -171,16 +240,72 @@ def importDatabaseEntities(db):
 		def values(self):
 			""" Returns list<Timestamp, float> """
 			if not hasattr(self, '_values_cache'):
-				self._values_cache = self._splitStringValues()
+				if self.binvalues:
+					years, values = self.arrays
+					self._values_cache = [(_getYearTimestamp(i), j) for i, j in zip(years.tolist(), values.tolist())]
+				else:
+					self._values_cache = self._splitStringValues()
 
 			return self._values_cache
 
 		@property
 		def fvalues(self):
 			if not hasattr(self, '_fvalues_cache'):
-				self._fvalues_cache = [(i.toYear(), j) for i, j in self.values]
+				if self.binvalues:
+					years, values = self.arrays
+					self._fvalues_cache = list(zip(years.astype(float).tolist(), values.tolist()))
+				else:
+					self._fvalues_cache = [(i.toYear(), j) for i, j in self.values]
 			return self._fvalues_cache
 
+		@property
+		def arrays(self):
+			""" Returns tuple<numpy.ndarray<int32>, numpy.ndarray<float64>>
+				The years and values of the series. Dates within a year are truncated to the year.
+			"""
+			if not hasattr(self, '_arrays_cache'):
+				cache_key = self.cacheKey
+				arrays = VALUE_CACHE.get(cache_key)
+				if arrays is None:
+					if self.binvalues:
+						arrays = self._unpackValues()
+					else:
+						_, years, values = encoding.decodeStringValues([self.strvalues])
+						arrays = (years, values)
+					VALUE_CACHE.put(cache_key, arrays)
+				self._arrays_cache = arrays
+			return self._arrays_cache
+
+		@property
+		def definition(self):
+			""" The SeriesDefinition with the text shared by every region, if there is one. """
+			if not hasattr(self, '_definition_cache'):
+				self._definition_cache = SeriesDefinition.get(report = self.report, code = self.code)
+			return self._definition_cache
+
+		@property
+		def name(self):
+			if self.localname or self.definition is None:
+				return self.localname
+			return self.definition.name
+
+		@property
+		def description(self):
+			if self.localdescription or self.definition is None:
+				return self.localdescription
+			return self.definition.description
+
+		@property
+		def notes(self):
+			if self.localnotes or self.definition is None:
+				return self.localnotes
+			return self.definition.notes
+
+		@property
+		def cacheKey(self):
+			""" The key used to store the decoded values in the process-wide value cache. """
+			return (self._cache_database, self.region.code, self.report.name, self.code)
+
 		@property
 		def key(self):
 			series_key = (self.region.key, self.report.key, self.code)
@@ -192,12 +317,12 @@ def importDatabaseEntities(db):
 			if compact:
 				series_region = self.region.key
 				series_report = self.report.key
-				series_units = self.unit.key
+				series_units = self.units.key
 				series_scale = self.scale.key
 			else:
 				series_region = self.region.toDict(True)
 				series_report = self.report.toDict(True)
-				series_units = self.unit.toDict(True)
+				series_units = self.units.toDict(True)
 				series_scale = self.scale.toDict(True)
 
 			if to_json:
@@ -205,7 +330,7 @@ def importDatabaseEntities(db):
 			else:
 				series_values = self.values
 
-
+			# The name, description and notes share one query for the definition.
 			data = {
 				'entityType':        'series',
 				'entityKey':         self.key,
@@ -359,6 +484,7 @@ def importDatabaseEntities(db):
 		'region':      Region,
 		'report':      Report,
 		'series':      Series,
+		'definition':  SeriesDefinition,
 		'tag':         Tag,
 		'unit':        Unit,
 		'scale':       Scale
@@ -1,6 +1,9 @@
 
 from . import tables
 from . import validation
+from . import encoding
+from . import cache
+from . import table_cache
 
-from ._table_converter import TableApi
+from ._table_converter import TableApi, RegionParseError
 from .entity_validation import *
@@ -1,9 +1,48 @@
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+import pandas
 import progressbar
 
 from package.utilities import tables
 from package.github import tabletools, pprint, timetools, numbertools
 from math import isnan
 from.entity_validation import ValidateApiResponse
+from . import table_cache
+
+
+class RegionParseError(Exception):
+	""" Raised when the rows of a region cannot be parsed.
+		Parameters
+		----------
+		region_code: str
+		exception_type: str
+			The name of the original exception's class.
+		message: str
+			The original exception's message.
+		details: str; default ''
+			The formatted traceback of the original exception. Included since the
+			traceback itself is lost when the error is raised in a worker process.
+	"""
+
+	def __init__(self, region_code, exception_type, message, details = ''):
+		super().__init__(region_code, exception_type, message, details)
+		self.region_code = region_code
+		self.exception_type = exception_type
+		self.message = message
+		self.details = details
+
+	def __str__(self):
+		return "Could not parse region '{}': {}: {}".format(self.region_code, self.exception_type, self.message)
+
+
+def _parseRegionGroup(region_code, region_group, report_columns, kwargs):
+	""" Parses a single region group. Runs in the worker processes used by TableApi. """
+	# Parsing does not depend on the state of the TableApi instance.
+	parser = TableApi.__new__(TableApi)
+	return parser._parseRegionGroup(region_code, region_group, report_columns, **kwargs)
 
 
 class TableApi:
@@ -28,8 +67,18 @@ class TableApi:
 		-----------------
 		* 'tableConfig': dict
 			Arguments to pass to pandas.DataFrame()
+		* 'useCache': bool; default True
+			Whether to load the parsed spreadsheet from the table cache. See table_cache.readTable().
 		* 'startDay': str; default '01-01'
 		* 'jsonCompatible': bool; default False
+		* 'stream': bool; default False
+			If True, data['regions'] is an iterator that parses and validates one region at a time
+			as it is consumed, ex. by RegionDatabase.addFromApi(). The regions can only be
+			consumed once, and 'saveTo' is not supported.
+		* 'processes': int; default None
+			If greater than 1, the region groups are parsed in parallel by this many worker
+			processes. The regions are still returned in the same order. A region that cannot
+			be parsed raises a RegionParseError.
 		* 'blacklist': list<str>
 			A list of series names or codes to skip when processing the table.
 		* 'whitelist': list<str>
@@ -65,10 +114,17 @@ class TableApi:
 		assert isinstance(namespace_key, str)
 		assert isinstance(report, dict)
 		assert isinstance(agency, dict)
+		stream = kwargs.get('stream', False)
+		if stream and 'saveTo' in kwargs:
+			message = "'saveTo' requires the entire report and cannot be used with 'stream'."
+			raise ValueError(message)
 
-		report_table = self._openTable(filename, **file_kwargs)
+		report_table = self._openTable(filename, use_cache = kwargs.get('useCache', True), **file_kwargs)
 
-		region_list = self._parseTable(report_table, **kwargs)
+		if stream:
+			region_list = self._iterateTable(report_table, **kwargs)
+		else:
+			region_list = self._parseTable(report_table, **kwargs)
 
 		report_information = {
 			'report':    report,
@@ -89,9 +145,9 @@ class TableApi:
 
 
 	@staticmethod
-	def _openTable(filename, **kwargs):
+	def _openTable(filename, use_cache = True, **kwargs):
 		if isinstance(filename, str):
-			table = tabletools.Table(filename, **kwargs)
+			table = table_cache.readTable(filename, use_cache = use_cache, **kwargs)
 		else:
 			table = filename
 
@@ -197,34 +253,97 @@ class TableApi:
 
 
 		"""
+		api_table = list(self._iterateTable(table, **kwargs))
+
+		return api_table
+
+	def _iterateTable(self, table, **kwargs):
+		""" Parses a table one region at a time. See _parseTable(). """
 
 		# Get the relevant columns for the data.
 
 		report_columns = self._getColumnNames(table.columns, **kwargs)
 		# pprint(report_columns)
-		api_table = list()
 		print("Converting the table into a compatible json format...")
 
+		# The x-values only depend on the year columns, so they are only converted once.
+		year_columns, _ = tables.separateTableColumns(table.columns)
+		x_values = self._getXValues(year_columns, kwargs['startDay'], kwargs['jsonCompatible'])
+
 		region_groups = table.groupby(by = report_columns['regionCodeColumn'])
-		index = 0
 		pbar = progressbar.ProgressBar(max_value = len(region_groups))
-		for region_code, region_group in region_groups:
-			index += 1
-			pbar.update(index)
+		parse_kwargs = dict(kwargs, year_columns = year_columns, x_values = x_values)
+		processes = kwargs.get('processes')
 
-			report_region = self._parseRegion(region_code, region_group, report_columns, **kwargs)
-			api_table.append(report_region)
+		if processes is not None and processes > 1:
+			report_regions = self._parseRegionGroups(region_groups, report_columns, parse_kwargs, processes)
+			report_regions = (self._setXValues(i, x_values) for i in report_regions)
+		else:
+			report_regions = (
+				self._parseRegionGroup(region_code, region_group, report_columns, **parse_kwargs)
+				for region_code, region_group in region_groups
+			)
 
-		return api_table
+		for index, report_region in enumerate(report_regions, 1):
+			pbar.update(index)
+			yield report_region
+		pbar.finish()
 
-	def _parseRegion(self, region_code, region_group, columns, **kwargs):
+	@staticmethod
+	def _parseRegionGroups(region_groups, report_columns, kwargs, processes):
+		""" Parses the region groups in a process pool and yields the results in the original order.
+			Only a limited number of groups are submitted ahead of the results being consumed,
+			so streamed tables are not read ahead entirely.
+			Timestamps are not sent between processes. The x-value of each point is returned
+			as the index of its year column instead. See _setXValues().
+		"""
+		kwargs = dict(kwargs, x_values = list(range(len(kwargs['x_values']))))
+		executor = ProcessPoolExecutor(processes)
+		pending = deque()
+		try:
+			for region_code, region_group in region_groups:
+				pending.append(executor.submit(_parseRegionGroup, region_code, region_group, report_columns, kwargs))
+				if len(pending) >= 4 * processes:
+					yield pending.popleft().result()
+			while pending:
+				yield pending.popleft().result()
+		finally:
+			for future in pending:
+				future.cancel()
+			executor.shutdown()
+
+	@staticmethod
+	def _setXValues(report_region, x_values):
+		""" Replaces the year column indices returned by the worker processes with the x-values. """
+		for series in report_region['regionSeries']:
+			series['seriesValues'] = [(x_values[i], j) for i, j in series['seriesValues']]
+		return report_region
+
+	def _parseRegionGroup(self, region_code, region_group, report_columns, **kwargs):
+		""" Wraps _parseRegion() so that any error is raised as a RegionParseError. """
+		try:
+			report_region = self._parseRegion(region_code, region_group, report_columns, **kwargs)
+		except RegionParseError:
+			raise
+		except Exception as exception:
+			raise RegionParseError(
+				region_code, type(exception).__name__, str(exception), traceback.format_exc()
+			) from exception
+		return report_region
+
+	def _parseRegion(self, region_code, region_group, columns, year_columns = None, x_values = None, **kwargs):
 		"""
 			Parses all rows belonging to a single region from a table.
+			The year columns are converted for all rows at once rather than row by row.
 		Parameters
 		----------
 		region_code: str
 		region_group: pandas.DataFrame
 		columns: dict<>
+		year_columns: list<str, int>; default None
+			The year columns of the table. Detected from `region_group` if not provided.
+		x_values: list<Timestamp, str>; default None
+			The x-value of each year column. See _getXValues().
 		kwargs
 
 		Returns
@@ -234,11 +353,20 @@ class TableApi:
 			* 'regionCode': str
 			* 'regionSeries': list<dict<>>
 		"""
+		if year_columns is None:
+			year_columns, _ = tables.separateTableColumns(region_group.columns)
+			x_values = self._getXValues(year_columns, kwargs['startDay'], kwargs['jsonCompatible'])
+		region_values = self._getTableValues(region_group, year_columns, x_values)
+
+		year_column_set = set(year_columns)
+		metadata_columns = [i for i in region_group.columns if i not in year_column_set]
+		rows = region_group[metadata_columns].to_dict('records')
+
 		region_series = list()
 		region_name = region_group[columns['regionNameColumn']].values[0]
-		for index, row in region_group.iterrows():
+		for row, series_values in zip(rows, region_values):
 
-			current_series = self._convertRow(row, columns, **kwargs)
+			current_series = self._convertRow(row, columns, series_values = series_values, **kwargs)
 
 			if current_series and len(current_series['seriesValues']) != 0:
 				region_series.append(current_series)
@@ -252,12 +380,14 @@ class TableApi:
 
 		return region_information
 
-	def _convertRow(self, row, report_columns, **kwargs):
+	def _convertRow(self, row, report_columns, series_values = None, **kwargs):
 		""" Converts a row into an importable dict.
 			Parameters
 			----------
 			row: dict, pandas.Series
 			report_columns: dict
+			series_values: list<tuple<Timestamp, float>>; default None
+				The values already read from the row's year columns, if available.
 
 			Keyword Arguments
 			-----------------
@@ -283,17 +413,10 @@ class TableApi:
 			subject_code = row[report_columns['seriesCodeColumn']]
 			subject_name = row[report_columns['seriesNameColumn']]
 		except KeyError as exception:
-			error_message = {
-				'exception':        exception,
-				'exceptionMessage': str(exception),
-				'parameters':       {
-					'row':            row,
-					'report_columns': report_columns,
-					'kwargs':         kwargs
-				}
-			}
-			pprint(error_message)
-			raise exception
+			message = "The column {} is missing from the table. Available columns: {}".format(
+				exception, list(row.keys())
+			)
+			raise KeyError(message) from exception
 
 		_in_whitelist = len(whitelist) != 0 or subject_code in whitelist
 		_not_in_blacklist = len(whitelist) == 0 and subject_code not in blacklist
@@ -339,7 +462,8 @@ class TableApi:
 			if series_notes is None:
 				series_notes = ''
 
-			series_values = self._getValues(row, kwargs['startDay'], kwargs['jsonCompatible'])
+			if series_values is None:
+				series_values = self._getValues(row, kwargs['startDay'], kwargs['jsonCompatible'])
 
 			json_series = {
 				'regionCode':        region_code,
@@ -361,27 +485,81 @@ class TableApi:
 		return json_series
 
 	@staticmethod
-	def _getValues(row, start_day, json_compatible):
-		""" Dates may take to following formats:
+	def _getXValues(year_columns, start_day, json_compatible):
+		""" Converts the year columns of a table into the x-values used for each series.
+			Dates may take to following formats:
 			* int, float: ex. 2017, 2017.0
 			* str ex. '2017', '2017-03-21'
 			* datetime object
 		"""
-		year_columns, _ = tables.separateTableColumns(row.keys())
-
+		if len(year_columns) == 0:
+			return []
 		# Check if the years include date information.
 		fy = year_columns[0]
 
 		if isinstance(fy, (int, float)) or (isinstance(fy, str) and fy.isdigit()):
-			values = [(str(int(y)) + '-' + start_day, row[y]) for y in year_columns]
+			x_values = [str(int(y)) + '-' + start_day for y in year_columns]
 		else:
-			values = [(y, row[y]) for y in year_columns]
-
-		values = [(i, numbertools.toNumber(j)) for i, j in values]
-		values = [(timetools.Timestamp(i), j) for i, j in values if not isnan(j)]
+			x_values = list(year_columns)
 
+		x_values = [timetools.Timestamp(i) for i in x_values]
 		if json_compatible:
-			values = [(i.toIso(), j) for i, j in values]
+			x_values = [i.toIso() for i in x_values]
+		return x_values
+
+	@staticmethod
+	def _getTableValues(table, year_columns, x_values):
+		""" Converts the year columns of a table from wide to long format.
+			Parameters
+			----------
+			table: pandas.DataFrame
+			year_columns: list<str, int>
+			x_values: list<Timestamp, str>
+				The x-value of each year column.
+			Returns
+			-------
+			list<list<tuple<Timestamp, float>>>
+				The (x, y) pairs of each row, skipping any missing values.
+		"""
+		year_table = table[year_columns]
+		values = numpy.empty(year_table.shape, dtype = float)
+		is_numeric = numpy.array([i.kind in 'fiub' for i in year_table.dtypes], dtype = bool)
+		if is_numeric.any():
+			values[:, is_numeric] = year_table.iloc[:, is_numeric].values.astype(float)
+		for index in numpy.flatnonzero(~is_numeric):
+			values[:, index] = TableApi._toNumbers(year_table.iloc[:, index].values)
+
+		# Select every non-missing cell. The cells are ordered by row, then by year.
+		row_index, column_index = numpy.nonzero(~numpy.isnan(values))
+		offsets = numpy.searchsorted(row_index, numpy.arange(len(table) + 1))
+		long_x = numpy.array(x_values, dtype = object)[column_index].tolist()
+		long_y = values[row_index, column_index].tolist()
+
+		table_values = [
+			list(zip(long_x[start:end], long_y[start:end]))
+			for start, end in zip(offsets[:-1], offsets[1:])
+		]
+		return table_values
+
+	@staticmethod
+	def _toNumbers(column):
+		""" Converts a column to floats. Only the cells pandas cannot parse (ex. '1,234') are
+			passed to numbertools.toNumber().
+		"""
+		numbers = pandas.to_numeric(column, errors = 'coerce').astype(float)
+		unparsed = numpy.isnan(numbers) & pandas.notnull(column)
+		if unparsed.any():
+			numbers[unparsed] = [numbertools.toNumber(i) for i in column[unparsed]]
+		return numbers
+
+	@staticmethod
+	def _getValues(row, start_day, json_compatible):
+		""" Reads the values of a single row. See _getXValues() and _getTableValues(). """
+		year_columns, _ = tables.separateTableColumns(row.keys())
+		x_values = TableApi._getXValues(year_columns, start_day, json_compatible)
+
+		values = [(i, numbertools.toNumber(row[y])) for i, y in zip(x_values, year_columns)]
+		values = [(i, j) for i, j in values if not isnan(j)]
 		return values
 
 	@staticmethod
@@ -413,15 +591,10 @@ class TableApi:
 				metadata_key = subject_code
 			metadata_value = metadata_map.get(metadata_key)
 		else:
-			error_message = {
-				'parameters': {
-					'metadata_map': metadata_map,
-					'subject_column': subject_code,
-					'row': row.keys()
-				}
-			}
-			pprint(error_message)
-			raise ValueError
+			message = "Could not read the metadata of series '{}' using {!r}. Available columns: {}".format(
+				subject_code, metadata_map, list(row.keys())
+			)
+			raise ValueError(message)
 		if isinstance(metadata_value, float) and isnan(metadata_value):
 			metadata_value = None
 		return metadata_value
\ No newline at end of file
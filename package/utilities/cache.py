@@ -0,0 +1,123 @@
+""" A process-wide cache of decoded series values.
+	Pony only keeps decoded values on the entity instances of a single db_session, so the
+	same series would otherwise be decoded again by every new session.
+"""
+import threading
+from collections import OrderedDict
+
+# Approximate memory used by the key and the containers of each entry.
+ENTRY_OVERHEAD = 256
+
+
+class ValueCache:
+	""" A least-recently-used cache that is bounded by the memory used by the cached arrays.
+		Parameters
+		----------
+		max_bytes: int; default 256MB
+			The total size of the cached arrays. The least recently used entries are evicted
+			once this is exceeded.
+
+		Notes
+		-----
+			Keys are tuples of the form (database, region, report, code).
+			Cached arrays are marked as read-only since they are shared between sessions.
+			Only the arrays themselves are counted, so views of a larger array should be copied
+			before they are cached.
+	"""
+
+	def __init__(self, max_bytes = 256 * 1024**2):
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._entries = OrderedDict()
+		self._lock = threading.RLock()
+
+	def __len__(self):
+		with self._lock:
+			return len(self._entries)
+
+	def __contains__(self, key):
+		with self._lock:
+			return key in self._entries
+
+	@staticmethod
+	def _getSize(arrays):
+		return sum(i.nbytes for i in arrays) + ENTRY_OVERHEAD
+
+	def get(self, key):
+		""" Returns the arrays saved under `key` or None if they are not cached. """
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				self.misses += 1
+				return None
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return entry[0]
+
+	def put(self, key, arrays):
+		""" Saves a tuple of numpy arrays under `key`, evicting old entries if required. """
+		for array in arrays:
+			array.flags.writeable = False
+		size = self._getSize(arrays)
+		with self._lock:
+			if key in self._entries:
+				self._remove(key)
+			if size > self.max_bytes:
+				return
+			self._entries[key] = (arrays, size)
+			self.size += size
+
+			while self.size > self.max_bytes:
+				oldest_key = next(iter(self._entries))
+				self._remove(oldest_key)
+				self.evictions += 1
+
+	def _remove(self, key):
+		_, size = self._entries.pop(key)
+		self.size -= size
+
+	def invalidate(self, database = None, report = None):
+		""" Removes all entries belonging to a database and/or report.
+			Parameters
+			----------
+			database: str; default None
+				If None, entries from all databases are removed.
+			report: str; default None
+				The name of a report. If None, entries from all reports are removed.
+			Returns
+			-------
+			int
+				The number of removed entries.
+		"""
+		with self._lock:
+			keys = [
+				key for key in self._entries
+				if (database is None or key[0] == database) and (report is None or key[2] == report)
+			]
+			for key in keys:
+				self._remove(key)
+		return len(keys)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self.size = 0
+
+	@property
+	def stats(self):
+		with self._lock:
+			data = {
+				'entries':   len(self._entries),
+				'bytes':     self.size,
+				'maxBytes':  self.max_bytes,
+				'hits':      self.hits,
+				'misses':    self.misses,
+				'evictions': self.evictions
+			}
+		return data
+
+
+VALUE_CACHE = ValueCache()
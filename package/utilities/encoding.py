@@ -0,0 +1,266 @@
+""" Conversions between the in-memory representation of a series' values and
+	the formats used to store them in the database.
+
+	Two storage formats are supported:
+	* 'strvalues': the legacy text format "year|value||year|value".
+	* 'binvalues': a packed binary buffer. The buffer holds `n` little-endian float64 values
+		followed by the `n` matching little-endian int32 years, so both arrays can be read
+		directly from the buffer without copying.
+"""
+import datetime
+import hashlib
+
+import numpy
+
+XY_SEPARATOR = '|'
+POINT_SEPARATOR = '||'
+
+VALUE_DTYPE = numpy.dtype('<f8')
+YEAR_DTYPE = numpy.dtype('<i4')
+POINT_SIZE = VALUE_DTYPE.itemsize + YEAR_DTYPE.itemsize
+
+# The summary statistics stored alongside the values of each series. See summarizeValues().
+SUMMARY_KEYS = ['firstyear', 'lastyear', 'points', 'minimum', 'maximum', 'latest', 'checksum']
+
+
+def toYear(x):
+	""" Converts an x-value to an integer year if it refers to the first day of that year.
+		Parameters
+		----------
+		x: int, float, str, datetime.date, Timestamp
+		Returns
+		-------
+		int, None
+			None if the x-value does not refer to the start of a year.
+	"""
+	if isinstance(x, bool):
+		year = None
+	elif isinstance(x, (int, numpy.integer)):
+		year = int(x)
+	elif isinstance(x, (float, numpy.floating)):
+		year = int(x) if float(x).is_integer() else None
+	elif isinstance(x, str):
+		prefix, suffix = x[:4], x[4:]
+		if not prefix.isdigit():
+			year = None
+		elif suffix == '' or (suffix.startswith('-01-01') and not suffix[6:].strip('T :0')):
+			year = int(prefix)
+		else:
+			year = None
+	elif isinstance(x, datetime.datetime):
+		is_start = (x.month, x.day, x.hour, x.minute, x.second, x.microsecond) == (1, 1, 0, 0, 0, 0)
+		year = x.year if is_start else None
+	elif hasattr(x, 'year') and hasattr(x, 'month') and hasattr(x, 'day'):
+		is_first_day = x.month == 1 and x.day == 1
+		is_midnight = not any(getattr(x, i, 0) for i in ['hour', 'minute', 'second', 'microsecond'])
+		year = x.year if is_first_day and is_midnight else None
+	else:
+		year = None
+
+	return year
+
+
+def packValues(values):
+	""" Packs a list of (x, y) pairs into the binary storage format.
+		Parameters
+		----------
+		values: list<tuple<x, float>>
+			The x-values should be years or refer to the first day of a year.
+		Returns
+		-------
+		bytes, None
+			None if any of the x-values cannot be represented as a year.
+	"""
+	if len(values) == 0:
+		return None
+	x_values, y_values = zip(*values)
+	year_array = _toYearArray(x_values)
+	if year_array is None:
+		return None
+	value_array = numpy.array(y_values, dtype = VALUE_DTYPE)
+
+	return value_array.tobytes() + year_array.tobytes()
+
+
+def _toYearArray(x_values):
+	""" Applies toYear() to a sequence of x-values. Strings and numbers are converted in bulk.
+		Returns None if any of the x-values does not refer to the start of a year.
+	"""
+	x_array = numpy.array(x_values)
+	kind = x_array.dtype.kind
+
+	if kind in 'iu':
+		years = x_array
+	elif kind == 'f' and (x_array == numpy.floor(x_array)).all():
+		years = x_array
+	elif kind == 'U' and x_array.ndim == 1:
+		lengths = numpy.char.str_len(x_array)
+		is_year = (lengths == 4) | ((lengths == 10) & numpy.char.endswith(x_array, '-01-01'))
+		digits = numpy.array(x_array, dtype = 'S4').view(numpy.uint8).reshape(-1, 4) - ord('0')
+		if is_year.all() and not (digits > 9).any():
+			years = digits.astype(YEAR_DTYPE) @ numpy.array([1000, 100, 10, 1], dtype = YEAR_DTYPE)
+		else:
+			years = [toYear(i) for i in x_values]
+	else:
+		years = [toYear(i) for i in x_values]
+
+	if not isinstance(years, numpy.ndarray) and None in years:
+		return None
+
+	return numpy.asarray(years, dtype = YEAR_DTYPE)
+
+
+def unpackValues(buffer):
+	""" Reads the years and values stored in a binary buffer.
+		Parameters
+		----------
+		buffer: bytes, memoryview
+		Returns
+		-------
+		years, values: numpy.ndarray<int32>, numpy.ndarray<float64>
+			Read-only views of the buffer.
+	"""
+	if len(buffer) % POINT_SIZE != 0:
+		message = "A buffer of {} bytes is not a valid series value buffer.".format(len(buffer))
+		raise ValueError(message)
+	length = len(buffer) // POINT_SIZE
+	values = numpy.frombuffer(buffer, dtype = VALUE_DTYPE, count = length)
+	years = numpy.frombuffer(buffer, dtype = YEAR_DTYPE, count = length, offset = length * VALUE_DTYPE.itemsize)
+
+	return years, values
+
+
+def summarizeValues(years, values):
+	""" Calculates the summary statistics saved with each series, so series can be filtered
+		without decoding their values.
+		Parameters
+		----------
+		years: numpy.ndarray<int32>
+		values: numpy.ndarray<float64>
+			The points of the series, in ascending order by year.
+		Returns
+		-------
+		dict<>
+			* 'firstyear', 'lastyear': int
+				The first and last year with a value.
+			* 'points': int
+				The number of values, excluding NaN.
+			* 'minimum', 'maximum': float
+			* 'latest': float
+				The value at 'lastyear'.
+			* 'checksum': str
+				The sha1 digest of the points in the binary format. Includes NaN values.
+			All statistics except 'points' and 'checksum' are None if the series has no values.
+	"""
+	years = numpy.asarray(years, dtype = YEAR_DTYPE)
+	values = numpy.asarray(values, dtype = VALUE_DTYPE)
+	checksum = hashlib.sha1(values.tobytes() + years.tobytes()).hexdigest()
+
+	is_valid = ~numpy.isnan(values)
+	valid_years = years[is_valid]
+	valid_values = values[is_valid]
+	if len(valid_values) == 0:
+		summary = dict.fromkeys(SUMMARY_KEYS)
+		summary['points'] = 0
+	else:
+		last_index = valid_years.argmax()
+		summary = {
+			'firstyear': int(valid_years.min()),
+			'lastyear':  int(valid_years[last_index]),
+			'points':    len(valid_values),
+			'minimum':   float(valid_values.min()),
+			'maximum':   float(valid_values.max()),
+			'latest':    float(valid_values[last_index])
+		}
+	summary['checksum'] = checksum
+	return summary
+
+
+def joinStringValues(values):
+	""" Formats a list of (x, y) pairs using the legacy 'strvalues' format. """
+	string = POINT_SEPARATOR.join("{}{}{}".format(i, XY_SEPARATOR, j) for i, j in values)
+	return string
+
+
+def decodeStringValues(strings, strict = False):
+	""" Decodes a number of 'strvalues' strings at once.
+		The points of every string are parsed in bulk, so no python objects are created per point.
+		Parameters
+		----------
+		strings: list<str>
+		strict: bool; default False
+			If True, raises a ValueError when an x-value refers to a date within a year.
+			Otherwise these dates are truncated to their year.
+		Returns
+		-------
+		offsets, years, values: numpy.ndarray<int64>, numpy.ndarray<int32>, numpy.ndarray<float64>
+			The points of the i-th string are stored in years[offsets[i]:offsets[i+1]] and
+			values[offsets[i]:offsets[i+1]]. Empty strings have no points.
+	"""
+	lengths = [(i.count(POINT_SEPARATOR) + 1 if i else 0) for i in strings]
+	offsets = numpy.zeros(len(lengths) + 1, dtype = numpy.int64)
+	numpy.cumsum(lengths, out = offsets[1:])
+
+	if offsets[-1] == 0:
+		return offsets, numpy.empty(0, dtype = YEAR_DTYPE), numpy.empty(0, dtype = VALUE_DTYPE)
+
+	string = POINT_SEPARATOR.join(i for i in strings if i)
+	tokens = string.replace(POINT_SEPARATOR, XY_SEPARATOR).split(XY_SEPARATOR)
+	if len(tokens) != 2 * offsets[-1]:
+		message = "The provided strings are not formatted as 'year{}value{}year{}value'".format(
+			XY_SEPARATOR, POINT_SEPARATOR, XY_SEPARATOR
+		)
+		raise ValueError(message)
+
+	x_values = tokens[0::2]
+	if strict:
+		x_array = numpy.array(x_values)
+		is_annual = (numpy.char.str_len(x_array) == 4) | numpy.char.endswith(x_array, '-01-01')
+		if not is_annual.all():
+			message = "'{}' does not refer to the start of a year.".format(x_array[~is_annual][0])
+			raise ValueError(message)
+
+	# The year is read from the first four ascii digits of each x-value.
+	digits = numpy.array(x_values, dtype = 'S4').view(numpy.uint8).reshape(-1, 4) - ord('0')
+	if len(digits) != len(x_values) or (digits > 9).any():
+		message = "One or more x-values do not begin with a four-digit year."
+		raise ValueError(message)
+	years = digits.astype(YEAR_DTYPE) @ numpy.array([1000, 100, 10, 1], dtype = YEAR_DTYPE)
+	values = numpy.array(tokens[1::2], dtype = VALUE_DTYPE)
+
+	return offsets, years, values
+
+
+def decodeValues(series_values):
+	""" Decodes the values of a number of series stored in either format.
+		Parameters
+		----------
+		series_values: list<tuple<bytes, str>>
+			The (binvalues, strvalues) pair of each series. 'binvalues' is used when present.
+		Returns
+		-------
+		offsets, years, values: numpy.ndarray<int64>, numpy.ndarray<int32>, numpy.ndarray<float64>
+			See decodeStringValues().
+	"""
+	string_values = [j for i, j in series_values if not i]
+	string_offsets, string_years, string_values = decodeStringValues(string_values)
+
+	year_arrays = list()
+	value_arrays = list()
+	string_index = 0
+	for binvalues, _ in series_values:
+		if binvalues:
+			years, values = unpackValues(binvalues)
+		else:
+			start, end = string_offsets[string_index], string_offsets[string_index + 1]
+			years, values = string_years[start:end], string_values[start:end]
+			string_index += 1
+		year_arrays.append(years)
+		value_arrays.append(values)
+
+	offsets = numpy.zeros(len(series_values) + 1, dtype = numpy.int64)
+	numpy.cumsum([len(i) for i in year_arrays], out = offsets[1:])
+	years = numpy.concatenate(year_arrays) if year_arrays else numpy.empty(0, dtype = YEAR_DTYPE)
+	values = numpy.concatenate(value_arrays) if value_arrays else numpy.empty(0, dtype = VALUE_DTYPE)
+
+	return offsets, years.astype(YEAR_DTYPE, copy = False), values.astype(VALUE_DTYPE, copy = False)
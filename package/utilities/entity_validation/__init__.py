@@ -1,2 +1,2 @@
-from ._api_response_validation import ValidateApiResponse
+from ._api_response_validation import ValidateApiResponse, ValidatedRegions
 from ._sql_validation import ValidateSqlResponse
\ No newline at end of file
@@ -3,6 +3,26 @@ from pprint import pprint
 from functools import partial
 pprint = partial(pprint, width = 180)
 from ._core_validation import CoreValidation
+
+
+class ValidatedRegions:
+	""" Wraps an iterable of regions so that each region is validated as it is consumed.
+		Used when the regions of a response are streamed rather than loaded into a list.
+		Parameters
+		----------
+		regions: iterable<dict<>>
+		validator: ValidateApiResponse
+	"""
+	def __init__(self, regions, validator):
+		self.regions = regions
+		self.validator = validator
+
+	def __iter__(self):
+		for region in self.regions:
+			self.validator._validateRegion(region)
+			yield region
+
+
 class ValidateApiResponse(CoreValidation):
 	"""
 		Expected Format:
@@ -31,6 +51,8 @@ class ValidateApiResponse(CoreValidation):
 				* 'seriesUnits': str, dict<>
 				* 'seriesScale': str, dict<>
 
+		If 'regions' is an iterator rather than a list, it is replaced with a ValidatedRegions
+		object and each region is validated as it is consumed.
 	"""
 
 	def __init__(self, response):
@@ -50,7 +72,10 @@ class ValidateApiResponse(CoreValidation):
 
 		self._validateReport(report_arguments)
 		self._validateAgency(report_agency_arguments)
-		self._validateReportData(report_data)
+		if isinstance(report_data, (list, tuple)):
+			self._validateReportData(report_data)
+		elif not isinstance(report_data, ValidatedRegions):
+			response['regions'] = ValidatedRegions(report_data, self)
 
 
 
@@ -84,46 +109,47 @@ class ValidateApiResponse(CoreValidation):
 	def _validateReportData(self, report_regions):
 		data_validation_status = list()
 		for region in report_regions:
+			self._validateRegion(region)
 
-			self.validateKeys('region', self.required_region_keys, region.keys())
-			region_name = region['regionName']
-			region_code = region['regionCode']
-			region_type = region['regionType']
-
-			name_is_valid = self._validateString(region_name)
-			code_is_valid = self._validateString(region_code)
-			type_is_valid = self._validateString(region_type)
+		return data_validation_status
 
-			region_validation_status = {
-				'regionNameIsValid':             name_is_valid,
-				'regionCodeIsValid':             code_is_valid,
-				'regionTypeIsValid':             type_is_valid
-			}
-			region_is_valid = all([name_is_valid, code_is_valid, type_is_valid])
+	def _validateRegion(self, region):
+		self.validateKeys('region', self.required_region_keys, region.keys())
+		region_name = region['regionName']
+		region_code = region['regionCode']
+		region_type = region['regionType']
 
-			if not region_is_valid:
-				region.pop('regionSeries')
-				self.showError('region', region, region_validation_status)
+		name_is_valid = self._validateString(region_name)
+		code_is_valid = self._validateString(region_code)
+		type_is_valid = self._validateString(region_type)
 
-			validated_region_series = list()
-			region_rows = region['regionSeries']
+		region_validation_status = {
+			'regionNameIsValid':             name_is_valid,
+			'regionCodeIsValid':             code_is_valid,
+			'regionTypeIsValid':             type_is_valid
+		}
+		region_is_valid = all([name_is_valid, code_is_valid, type_is_valid])
 
-			for rs in region_rows:
-				if not hasattr(rs, 'keys'):
-					for i, s in enumerate(region_rows):
-						print(i, '\t', type(s))
+		if not region_is_valid:
+			region.pop('regionSeries')
+			self.showError('region', region, region_validation_status)
 
-				series_validation_status = self._validateSeries(rs)
-				series_is_valid = series_validation_status['validationStatus']
+		validated_region_series = list()
+		region_rows = region['regionSeries']
 
-				if not series_is_valid:
-					self.showError('series', rs, series_validation_status)
-				else:
-					validated_region_series.append(series_validation_status)
+		for rs in region_rows:
+			if not hasattr(rs, 'keys'):
+				for i, s in enumerate(region_rows):
+					print(i, '\t', type(s))
 
+			series_validation_status = self._validateSeries(rs)
+			series_is_valid = series_validation_status['validationStatus']
 
+			if not series_is_valid:
+				self.showError('series', rs, series_validation_status)
+			else:
+				validated_region_series.append(series_validation_status)
 
-		return data_validation_status
 
 	def _validateAgency(self, report_agency):
 
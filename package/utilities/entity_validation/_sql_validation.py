@@ -1,4 +1,5 @@
 from ._core_validation import CoreValidation
+from .. import encoding
 
 
 class ValidateSqlResponse(CoreValidation):
@@ -38,6 +39,30 @@ class ValidateSqlResponse(CoreValidation):
 				print("{}\t{}\t{}".format(i, j, k))
 		return is_valid
 
+	@staticmethod
+	def validatebinValues(values):
+		""" Checks that the values of a series are packed points, as written by encoding.packValues().
+
+		Parameters
+		----------
+		values: bytes
+			The 'binvalues' column of the series.
+
+		Returns
+		-------
+		bool
+			Whether `values` is a non-empty bytes object with a whole number of points.
+		"""
+		point_size = encoding.POINT_SIZE
+		if not isinstance(values, bytes):
+			print("Series Values: expected bytes, got {}".format(type(values).__name__))
+			return False
+
+		is_valid = len(values) > 0 and len(values) % point_size == 0
+		if not is_valid:
+			print("Series Values: {} bytes is not a multiple of {}".format(len(values), point_size))
+		return is_valid
+
 	def validateRegion(self, response):
 		required_region_keys = ['name', 'code', 'type']
 
@@ -102,8 +127,10 @@ class ValidateSqlResponse(CoreValidation):
 
 	def validateSeries(self, response):
 		expected_series_keys = [
-			'region', 'report', 'code', 'name', 'description', 'notes', 'units', 'scale', 'strvalues'
+			'region', 'report', 'code', 'name', 'description', 'notes', 'units', 'scale'
 		]
+		if 'binvalues' not in response:
+			expected_series_keys.append('strvalues')
 
 		self.validateKeys('series', expected_series_keys, response.keys())
 
@@ -116,7 +143,10 @@ class ValidateSqlResponse(CoreValidation):
 
 		series_units = response['units']
 		series_scale = response['scale']
-		series_values = response['strvalues']
+		if 'binvalues' in response:
+			series_values_are_valid = self.validatebinValues(response['binvalues'])
+		else:
+			series_values_are_valid = self.validatestrValues(response['strvalues'])
 
 		series_validation_status = {
 			'seriesNameIsValid':        self._validateString(series_name),
@@ -127,7 +157,7 @@ class ValidateSqlResponse(CoreValidation):
 			'seriesReportIsValid':      self.validateEntity(series_report, 'report'),
 			'seriesUnitsAreValid':      self.validateEntity(series_units, 'units'),
 			'seriesScaleIsValid':       self.validateEntity(series_scale, 'scale'),
-			'seriesValuesAreValid':     self.validatestrValues(series_values)
+			'seriesValuesAreValid':     series_values_are_valid
 		}
 
 		if not all(series_validation_status.values()):
@@ -1,4 +1,4 @@
-from ...github import tabletools
+from .. import table_cache
 from ...data import configuration
 
 def importStateNamespace(dataset):
@@ -11,7 +11,7 @@ def importStateNamespace(dataset):
     namespace_config = configuration.namespaces['ST']
     namespace = dataset.insertEnity('namespace', **namespace_config)
 
-    table = tabletools.Table(filename)
+    table = table_cache.readTable(filename)
 
     for row in table:
 
@@ -50,7 +50,7 @@ def importFipsNamespace(dataset):
     fips_namespace_config = configuration.namespaces['FIPS']
     namespace = dataset.insertEntity('namespace', **fips_namespace_config)
 
-    table = tabletools.Table(filename) 
+    table = table_cache.readTable(filename)
 
     for row in table:
         
@@ -1,7 +1,7 @@
 import os
 
 
-from ...github import tabletools
+from .. import table_cache
 from ._common import namespace_data_folder
 
 FILENAME = os.path.join(namespace_data_folder, "country-codes.xlsx")
@@ -52,7 +52,7 @@ def importIsoNamespace():
 	"""
 	filename = FILENAME
 
-	table = tabletools.Table(filename)
+	table = table_cache.readTable(filename)
 
 	iso_namespace = {
 		'code': 'ISO',
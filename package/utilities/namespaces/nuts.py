@@ -1,14 +1,14 @@
 
 from pony.orm import db_session
 
-from ...github import tabletools
+from .. import table_cache
 from ...data import configuration
 
 
 @db_session
 def importNutsNamespace(dataset):
 	nuts_filename = configuration.files['NUTS']
-	table = tabletools.Table(
+	table = table_cache.readTable(
 		nuts_filename,
 		sheetname = "NUTS2013-NUTS2016", 
 		skiprows = 1
@@ -0,0 +1,196 @@
+""" An on-disk cache of parsed spreadsheets.
+	Parsing large excel workbooks takes far longer than reading the same data back from a binary
+	format, so each parsed sheet is saved once and reused until the source file changes.
+
+	Each sheet is saved to its own folder, with one .npy file per column so the columns can be
+	memory-mapped when the sheet is loaded again:
+	* Numeric, boolean and datetime columns are saved as-is.
+	* Text columns are saved as a fixed-width unicode array along with a mask of missing values.
+	* Any other column (ex. mixed types) is pickled.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from ..data import configuration
+from ..github import tabletools
+
+CACHE_FOLDER = os.path.join(configuration.data_directory, 'cache', 'tables')
+
+# Changing the layout of the cached files invalidates every existing entry.
+FORMAT_VERSION = 1
+METADATA_FILENAME = 'metadata.pkl'
+SHEETS_FILENAME = 'sheets.pkl'
+
+
+def _getCacheKey(filename, kwargs):
+	""" Identifies a parsed sheet by the source file, its modification time and size, and the
+		arguments used to parse it.
+	"""
+	status = os.stat(filename)
+	key = repr((FORMAT_VERSION, os.path.abspath(filename), status.st_mtime_ns, status.st_size, sorted(kwargs.items())))
+	return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _readFrame(filename, **kwargs):
+	""" Parses a sheet with pandas, the same way tabletools.Table does. """
+	if filename.endswith(('.xls', '.xlsx')):
+		frame = pandas.read_excel(filename, **kwargs)
+	else:
+		frame = pandas.read_csv(filename, **kwargs)
+	return frame
+
+
+def _saveFrame(frame, folder):
+	""" Saves a dataframe to an empty folder. """
+	columns = list()
+	for position in range(frame.shape[1]):
+		series = frame.iloc[:, position]
+		path = os.path.join(folder, '{}.npy'.format(position))
+
+		if isinstance(series.dtype, numpy.dtype) and series.dtype.kind in 'biufcmM':
+			column_format = 'array'
+			numpy.save(path, series.values, allow_pickle = False)
+		else:
+			values = numpy.asarray(series.values, dtype = object)
+			is_missing = pandas.isnull(values)
+			is_text = series.dtype == object or isinstance(series.dtype, pandas.StringDtype)
+			if is_text and all(isinstance(i, str) for i in values[~is_missing]):
+				column_format = 'string'
+				strings = numpy.array(numpy.where(is_missing, '', values).tolist(), dtype = str)
+				numpy.save(path, strings, allow_pickle = False)
+				numpy.save(os.path.join(folder, '{}.missing.npy'.format(position)), is_missing, allow_pickle = False)
+			else:
+				column_format = 'pickle'
+				path = os.path.join(folder, '{}.pkl'.format(position))
+				with open(path, 'wb') as file1:
+					pickle.dump(series, file1, protocol = pickle.HIGHEST_PROTOCOL)
+		columns.append((column_format, series.dtype))
+
+	metadata = {
+		'version': FORMAT_VERSION,
+		'columns': frame.columns,
+		'index':   frame.index,
+		'formats': columns
+	}
+	with open(os.path.join(folder, METADATA_FILENAME), 'wb') as file1:
+		pickle.dump(metadata, file1, protocol = pickle.HIGHEST_PROTOCOL)
+
+
+def _loadFrame(folder):
+	""" Loads a dataframe saved with _saveFrame(). Array columns are memory-mapped. """
+	with open(os.path.join(folder, METADATA_FILENAME), 'rb') as file1:
+		metadata = pickle.load(file1)
+
+	columns = dict()
+	for position, (column_format, dtype) in enumerate(metadata['formats']):
+		path = os.path.join(folder, '{}.npy'.format(position))
+		if column_format == 'array':
+			values = numpy.load(path, mmap_mode = 'r')
+		elif column_format == 'string':
+			values = numpy.load(path, mmap_mode = 'r').astype(object)
+			values[numpy.load(os.path.join(folder, '{}.missing.npy'.format(position)))] = numpy.nan
+			if dtype != object:
+				values = pandas.array(values, dtype = dtype)
+		else:
+			with open(os.path.join(folder, '{}.pkl'.format(position)), 'rb') as file1:
+				values = pickle.load(file1).values
+		columns[position] = values
+
+	frame = pandas.DataFrame(columns, index = metadata['index'])
+	frame.columns = metadata['columns']
+	return frame
+
+
+def _saveFrames(frames, folder):
+	""" Saves the dataframe of each sheet when an entire workbook is read at once. """
+	for index, frame in enumerate(frames.values()):
+		sheet_folder = os.path.join(folder, str(index))
+		os.mkdir(sheet_folder)
+		_saveFrame(frame, sheet_folder)
+	with open(os.path.join(folder, SHEETS_FILENAME), 'wb') as file1:
+		pickle.dump(list(frames.keys()), file1, protocol = pickle.HIGHEST_PROTOCOL)
+
+
+def _loadFrames(folder):
+	with open(os.path.join(folder, SHEETS_FILENAME), 'rb') as file1:
+		sheets = pickle.load(file1)
+	frames = {sheet: _loadFrame(os.path.join(folder, str(index))) for index, sheet in enumerate(sheets)}
+	return frames
+
+
+def readFrame(filename, cache_folder = None, **kwargs):
+	""" Parses a sheet into a dataframe, reusing the cached copy if the file has not changed.
+		Parameters
+		----------
+		filename: str
+		cache_folder: str; default None
+			Defaults to CACHE_FOLDER.
+		**kwargs
+			Passed to pandas.read_excel() or pandas.read_csv(), ex. 'sheet_name', 'skiprows'.
+			'sheetname' is accepted as an alias of 'sheet_name', as with tabletools.Table.
+		Returns
+		-------
+		pandas.DataFrame, dict<str, pandas.DataFrame>
+			A dict of every sheet if the sheet name is None, as with pandas.read_excel().
+	"""
+	if cache_folder is None:
+		cache_folder = CACHE_FOLDER
+	if 'sheetname' in kwargs:
+		# Current versions of pandas only accept 'sheet_name'.
+		kwargs['sheet_name'] = kwargs.pop('sheetname')
+	folder = os.path.join(cache_folder, _getCacheKey(filename, kwargs))
+
+	if os.path.exists(os.path.join(folder, METADATA_FILENAME)):
+		return _loadFrame(folder)
+	elif os.path.exists(os.path.join(folder, SHEETS_FILENAME)):
+		return _loadFrames(folder)
+
+	frame = _readFrame(filename, **kwargs)
+
+	# Written to a temporary folder first so an interrupted write is never loaded.
+	os.makedirs(cache_folder, exist_ok = True)
+	temporary_folder = tempfile.mkdtemp(dir = cache_folder)
+	try:
+		if isinstance(frame, dict):
+			_saveFrames(frame, temporary_folder)
+		else:
+			_saveFrame(frame, temporary_folder)
+		os.replace(temporary_folder, folder)
+	except OSError:
+		# The sheet could not be cached, ex. another process cached it first.
+		shutil.rmtree(temporary_folder, ignore_errors = True)
+
+	return frame
+
+
+def readTable(filename, use_cache = True, **kwargs):
+	""" Drop-in replacement for tabletools.Table(filename, **kwargs) that caches the parsed sheet.
+		Parameters
+		----------
+		filename: str
+		use_cache: bool; default True
+			If False, the file is parsed with tabletools.Table as usual.
+		**kwargs
+			See readFrame().
+		Returns
+		-------
+		tabletools.Table
+	"""
+	if not use_cache:
+		kwargs.pop('cache_folder', None)
+		return tabletools.Table(filename, **kwargs)
+	return tabletools.Table(readFrame(filename, **kwargs))
+
+
+def clearCache(cache_folder = None):
+	""" Deletes every cached sheet. """
+	if cache_folder is None:
+		cache_folder = CACHE_FOLDER
+	if os.path.exists(cache_folder):
+		shutil.rmtree(cache_folder)
@@ -139,6 +139,14 @@ def parseEntityArguments(entity_type, entity_args = None, **kwargs):
 			'scale':       parseKeywords(result, ['scale', 'Scale', 'seriesScale', 'subjectScale']),
 			# 'strvalues': parseKeywords(result, ['strvalues']),
 			'strvalues':   parseKeywords(result, ['values', 'seriesValues', 'strvalues']),
+			'binvalues':   parseKeywords(result, ['binvalues']),
+			'firstyear':   parseKeywords(result, ['firstyear']),
+			'lastyear':    parseKeywords(result, ['lastyear']),
+			'points':      parseKeywords(result, ['points']),
+			'minimum':     parseKeywords(result, ['minimum']),
+			'maximum':     parseKeywords(result, ['maximum']),
+			'latest':      parseKeywords(result, ['latest']),
+			'checksum':    parseKeywords(result, ['checksum']),
 			'tags':        parseKeywords(result, ['tags', 'attributes']),
 			'description': parseKeywords(result, ['seriesDescription', 'description', 'subjectDescription'])
 		}
@@ -1,5 +1,5 @@
 
-from package.github import tabletools
+from package.utilities import table_cache
 from .configuration_tools import *
 from ..data import configuration
 
@@ -56,7 +56,7 @@ def importIsoNamespace():
 
 	if not iso_configuration:
 		filename = ISO_NAMESPACE_FILENAME
-		table = tabletools.Table(filename)
+		table = table_cache.readTable(filename)
 
 		iso_namespace = {
 			'code':     'ISO',
@@ -5,7 +5,7 @@
 from package.github import tabletools, timetools
 import re
 
-from package.utilities import TableApi
+from package.utilities import TableApi, table_cache
 import os
 
 import pandas
@@ -141,10 +141,10 @@ def getWorldDevelopmentIndicatorsConfiguration(filename):
 		# data_sheet = tabletools.Table(filename, sheetname = 'Data')
 
 		print("Loading notes sheet...")
-		notes_sheet = tabletools.Table(filename, sheetname = 'Country-Series')
+		notes_sheet = table_cache.readTable(filename, sheetname = 'Country-Series')
 
 		print("Loading series sheet...")
-		series_sheet = tabletools.Table(filename, sheetname = 'Series')
+		series_sheet = table_cache.readTable(filename, sheetname = 'Series')
 
 		series_description_map = dict()
 		series_tag_map = dict()
@@ -248,9 +248,9 @@ def addWorldPopulationProspects(filename):
 			'CONSTANT-MORTALITY':  'POP.PROJ.CONST.MORT'
 		}
 
-		table_dict = pandas.read_excel(filename, sheetname = None, skiprows = 16)  # Creates a dict of dataframes.
+		table_dict = table_cache.readFrame(filename, sheetname = None, skiprows = 16)  # Creates a dict of dataframes.
 		table_dict.pop('NOTES')
-		notes_table = tabletools.Table(filename, sheetname = 'NOTES')
+		notes_table = table_cache.readTable(filename, sheetname = 'NOTES')
 		print("Extracting notes...")
 		notes_dict = dict()
 
@@ -1,7 +1,8 @@
 from series_tests import TestSeriesMethods
 from entity_tests import VerifyEntityData
-from database_tests import TestDataset
+from database_tests import TestDataset, TestMigration, TestImport
 from widget_tests import TestWidgets
+from utility_tests import TestValueEncoding, TestValueCache, TestTableCache, TestTableApi
 from pony.orm import db_session
 import unittest
 
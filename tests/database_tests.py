@@ -1,10 +1,128 @@
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
 import unittest
+import numpy
 
-from common import DATASET, TEST_IDENTIFIER, TEST_REGION, TEST_SERIES, TEST_REPORT
+from pony.orm import db_session, select, OperationalError
+from common import utilities, RegionDatabase, RegionSnapshot, compileSnapshot, exportDatabase, iterateExport, migrateDatabase, DATASET, TEST_IDENTIFIER, TEST_REGION, TEST_SERIES, TEST_REPORT
 
 region_code = TEST_IDENTIFIER['string']
 series_code = TEST_SERIES['code']
 
+# The series table as created before values were saved as 'binvalues'.
+BASELINE_SERIES_SCHEMA = """CREATE TABLE "Series" (
+  "region" TEXT NOT NULL REFERENCES "Region" ("code") ON DELETE CASCADE,
+  "report" TEXT NOT NULL REFERENCES "Report" ("name") ON DELETE CASCADE,
+  "code" TEXT NOT NULL,
+  "name" TEXT NOT NULL,
+  "description" TEXT NOT NULL,
+  "notes" TEXT NOT NULL,
+  "units" TEXT REFERENCES "Unit" ("string") ON DELETE SET NULL,
+  "scale" TEXT REFERENCES "Scale" ("string") ON DELETE SET NULL,
+  "strvalues" TEXT NOT NULL,
+  PRIMARY KEY ("region", "report", "code")
+)"""
+
+def makeReport(name = 'Test Report', regions = 6, codes = ('LP', 'NGDP')):
+	""" Builds an API response with a series for each code in each region. addFromApi() modifies
+		the response, so a new one is needed for each import.
+	"""
+	report_regions = list()
+	for index in range(regions):
+		region_series = list()
+		for code in codes:
+			region_series.append({
+				'seriesName':        'Series ' + code,
+				'seriesCode':        code,
+				# The first region has its own description, which is saved with the series.
+				'seriesDescription': 'Description of region {}'.format(index) if index == 0 else 'Description of ' + code,
+				'seriesNotes':       'Notes on ' + code,
+				'seriesTags':        list(),
+				'seriesUnits':       'Persons',
+				'seriesScale':       'Millions',
+				'seriesValues':      [('{}-01-01'.format(year), index + year / 8 + len(code)) for year in range(2000, 2000 + index + 5)]
+			})
+		report_regions.append({
+			'regionName':   'Region {}'.format(index),
+			'regionCode':   'R{:02}'.format(index),
+			'regionType':   'country',
+			'regionParent': None,
+			'regionSeries': region_series
+		})
+
+	report = {
+		'report':    {'reportName': name, 'reportCode': 'TR', 'reportDate': '2017', 'reportUrl': 'http://www.example.com/report'},
+		'agency':    {'agencyName': 'Test Agency', 'agencyCode': 'TA', 'agencyAddress': 'Address', 'agencyUrl': 'http://www.example.com'},
+		'namespace': 'TST',
+		'regions':   report_regions
+	}
+	return report
+
+def makeImport(**kwargs):
+	""" Builds the argument of addReport() from the same series as makeReport(). """
+	report = makeReport(**kwargs)
+	data = {
+		'report':  report['report'],
+		'agency':  report['agency'],
+		'regions': [{i: region[i] for i in ['regionCode', 'regionName', 'regionType', 'regionParent']} for region in report['regions']],
+		'series':  [dict(series, regionKey = region['regionCode']) for region in report['regions'] for series in region['regionSeries']],
+		'scales':  [{'scaleString': 'Millions'}],
+		'units':   [{'unitString': 'Persons', 'unitCode': 'P'}]
+	}
+	return data
+
+def failAfter(function, calls):
+	""" Wraps `function` so that it raises a RuntimeError once it has been called `calls` times,
+		ex. to interrupt an import partway through.
+	"""
+	counter = itertools.count()
+	def wrapper(*args, **kwargs):
+		if next(counter) >= calls:
+			raise RuntimeError("Interrupted")
+		return function(*args, **kwargs)
+	return wrapper
+
+def createDatabase(filename, **kwargs):
+	""" Creates an empty database with the namespace used by makeReport(). """
+	database = RegionDatabase(filename, create = True, **kwargs)
+	with db_session:
+		database.Namespace(name = 'Test Namespace', code = 'TST', regex = '.*', url = 'http://www.example.com')
+	return database
+
+def downgradeDatabase(filename):
+	""" Converts a database to the schema used before migrateDatabase() was added. The values of each
+		series are saved as 'strvalues' and the series definitions and search index are removed.
+	"""
+	connection = sqlite3.connect(filename)
+	rows = connection.execute("""SELECT s."region", s."report", s."code", COALESCE(NULLIF(s."name", ''), d."name"),
+		COALESCE(NULLIF(s."description", ''), d."description"), COALESCE(NULLIF(s."notes", ''), d."notes"),
+		s."units", s."scale", s."binvalues"
+		FROM "Series" s JOIN "SeriesDefinition" d ON d."report" = s."report" AND d."code" = s."code"
+		ORDER BY s.rowid""").fetchall()
+	rows = [
+		i[:-1] + ('||'.join('{}|{}'.format(*j) for j in zip(*[k.tolist() for k in utilities.encoding.unpackValues(i[-1])])),)
+		for i in rows
+	]
+	with connection:
+		for table in ['Series', 'SeriesDefinition', 'SearchIndex']:
+			connection.execute('DROP TABLE "{}"'.format(table))
+		connection.execute(BASELINE_SERIES_SCHEMA)
+		connection.executemany('INSERT INTO "Series" VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+	connection.close()
+
+def createBaselineDatabase(folder):
+	""" Creates a database with the schema used before migrateDatabase() was added. Returns the filename. """
+	filename = os.path.join(folder, 'baseline.sqlite')
+	database = createDatabase(filename)
+	database.addFromApi(makeReport(), verbose = False)
+	database._main_database.disconnect()
+	downgradeDatabase(filename)
+	return filename
+
 class TestDataset(unittest.TestCase):
 
 	def testRegionLookup(self):
@@ -14,6 +132,19 @@ class TestDataset(unittest.TestCase):
 		assert region.parentRegion == TEST_REGION['parentRegion']
 		assert region.regionType == TEST_REGION['regionType']
 
+	def testResolveRegions(self):
+		region_codes = DATASET.resolveRegions([region_code, 'BLAH'])
+
+		assert region_codes[0] == DATASET.getRegion(region_code).code
+		assert region_codes[1] is None
+
+	def testRegionsLookup(self):
+		regions = DATASET.getRegions([region_code, 'BLAH'])
+
+		assert list(regions) == [region_code]
+		assert regions[region_code].name == TEST_REGION['name']
+		assert regions.missing == ['BLAH']
+
 	def testSeriesLookup(self):
 
 		series = DATASET.getSeries(region_code, series_code).first()
@@ -21,6 +152,115 @@ class TestDataset(unittest.TestCase):
 		assert series.name == TEST_SERIES['name']
 		assert series.code == TEST_SERIES['code']
 
+	@db_session
+	def testLoadValues(self):
+		series = list(select(s for s in DATASET.Series if s.code == series_code)[:10])
+		offsets, years, values = DATASET.loadValues(series)
+
+		assert len(offsets) == len(series) + 1
+		for entity in series:
+			# Cached values are copies rather than views of the decoded batch.
+			assert all(i.base is None for i in utilities.cache.VALUE_CACHE.get(entity.cacheKey))
+
+	def testPanelLookup(self):
+		region = DATASET.getRegion(region_code)
+		panel = DATASET.getPanel(TEST_REPORT['name'], series_code, regions = [region_code])
+
+		assert panel.index.tolist() == [region.code]
+		assert panel.shape[1] > 0
+
+		# Regions of another type are dropped rather than returned as rows of NaN.
+		other_type = DATASET.getPanel(TEST_REPORT['name'], series_code, regions = [region_code], region_type = 'not a type')
+		assert len(other_type) == 0
+
+	def testPanelWithoutReport(self):
+		database = createDatabase(os.path.join(tempfile.mkdtemp(), 'panel.sqlite'))
+		database.addFromApi(makeReport(), verbose = False)
+		panel = database.getPanel(None, 'LP')
+		assert panel.equals(database.getPanel('Test Report', 'LP'))
+		assert panel.index.tolist() == ['R{:02}'.format(i) for i in range(6)]
+		assert len(database.getPanel(None, 'MISSING')) == 0
+
+		database.addFromApi(makeReport(name = 'Other Report', codes = ('LP',)), verbose = False)
+		with self.assertRaises(ValueError):
+			database.getPanel(None, 'LP')
+		assert database.getPanel(None, 'NGDP').equals(database.getPanel('Test Report', 'NGDP'))
+
+	def testCrossSection(self):
+		matrix = numpy.array([[1.0, numpy.nan, 3.0], [numpy.nan, 5.0, numpy.nan]])
+		years = numpy.array([2000, 2001, 2002])
+
+		exact = RegionDatabase._interpolatePanel(matrix, years, 2001, 'exact')
+		inner = RegionDatabase._interpolatePanel(matrix, years, 2002, 'inner')
+		interpolated = RegionDatabase._interpolatePanel(matrix, years, 2002, 'interpolate')
+
+		assert numpy.isnan(exact[0]) and exact[1] == 5.0
+		assert inner[0] == 3.0 and numpy.isnan(inner[1])
+		assert interpolated.tolist() == [3.0, 5.0]
+
+	def testSeriesDefinition(self):
+		series = DATASET.getSeries(region_code, series_code).first()
+
+		assert series.definition.code == series.code
+		assert series.description == TEST_SERIES['description']
+		assert series.notes == TEST_SERIES['notes']
+
+	def testSearch(self):
+		results = DATASET.search(TEST_SERIES['name'], kind = 'series')
+
+		assert series_code in [i['code'] for i in results]
+		assert DATASET.search('') == []
+
+	def testCatalogue(self):
+		catalogue = DATASET.getCatalogue(TEST_REPORT['name'])
+		series = [i for i in catalogue if i['seriesCode'] == series_code][0]
+
+		assert series['seriesName'] == TEST_SERIES['name']
+		assert series['regions'] >= 1
+		assert DATASET.getCatalogue(TEST_REPORT['name'], limit = 1) == catalogue[:1]
+
+	@db_session
+	def testSerialize(self):
+		series = DATASET.getSeries(region_code, series_code)
+		data = DATASET.serialize([series])[0]
+
+		assert data['seriesCode'] == series_code
+		assert data['seriesRegion']['regionName'] == TEST_REGION['name']
+		assert data['seriesReport']['reportName'] == TEST_REPORT['name']
+
+		with self.assertRaises(ValueError):
+			DATASET.serialize([series], expand = 2)
+		with self.assertRaises(ValueError):
+			DATASET.serialize([series, series.region])
+
+	def testExport(self):
+		folder = tempfile.mkdtemp()
+		filename = DATASET.filename
+		exportDatabase(filename, os.path.join(folder, 'series.ndjson'), report = TEST_REPORT['name'])
+		exportDatabase(filename, os.path.join(folder, 'series.npz'), report = TEST_REPORT['name'], batch_size = 10)
+
+		with open(os.path.join(folder, 'series.ndjson')) as file1:
+			lines = [json.loads(line) for line in file1]
+		assert {i['report'] for i in lines} == {TEST_REPORT['name']}
+		assert series_code in {i['code'] for i in lines}
+
+		chunks = list(iterateExport(os.path.join(folder, 'series.npz')))
+		points = sum(len(i['value']) for i in chunks)
+		assert points == sum(sum(value is not None for _, value in i['values']) for i in lines)
+
+	def testSnapshot(self):
+		filename = compileSnapshot(DATASET.filename, os.path.join(tempfile.mkdtemp(), 'test.snapshot'))
+		snapshot = RegionSnapshot(filename)
+
+		region = snapshot.getRegion(region_code)
+		assert region.name == TEST_REGION['name']
+
+		series = snapshot.getSeries(region_code, series_code, report = TEST_REPORT['name'])
+		assert numpy.array_equal(series.values, DATASET.getSeries(region_code, series_code).arrays[1], equal_nan = True)
+
+		panel = snapshot.getPanel(TEST_REPORT['name'], series_code)
+		assert panel.equals(DATASET.getPanel(TEST_REPORT['name'], series_code))
+
 	def testDatasetAccess(self):
 		invalid_code = 'BLAH'
 		valid_code = TEST_REPORT['name']
@@ -28,4 +268,248 @@ class TestDataset(unittest.TestCase):
 		invalid_report = DATASET.access('get', 'report', invalid_code)
 
 		assert valid_report.code == TEST_REPORT['code']
-		assert invalid_report is None 
+		assert invalid_report is None
+
+	def testConnectionProfile(self):
+		database = RegionDatabase(':memory:', create = True, profile = 'bulk')
+		database.setProfile('serve')
+		with db_session:
+			assert database._query('PRAGMA query_only').fetchone()[0] == 1
+		database.setProfile('default')
+		with db_session:
+			assert database._query('PRAGMA query_only').fetchone()[0] == 0
+
+		with self.assertRaises(KeyError):
+			database.setProfile('invalid')
+
+	def testServeProfile(self):
+		database = createDatabase(os.path.join(tempfile.mkdtemp(), 'serve.sqlite'))
+		with db_session:
+			assert database._query('PRAGMA query_only').fetchone()[0] == 0
+
+		database.setProfile('serve')
+		with db_session:
+			assert database._query('PRAGMA query_only').fetchone()[0] == 1
+			assert database.Namespace.get(code = 'TST') is not None
+		with self.assertRaises(OperationalError):
+			with db_session:
+				database._query('DELETE FROM "Namespace"')
+
+		database.setProfile('default')
+		with db_session:
+			assert database._query('PRAGMA query_only').fetchone()[0] == 0
+
+
+class TestMigration(unittest.TestCase):
+
+	def setUp(self):
+		self.filename = createBaselineDatabase(tempfile.mkdtemp())
+		connection = sqlite3.connect(self.filename)
+		self.strvalues = {i[:3]: i[3] for i in connection.execute('SELECT "region", "report", "code", "strvalues" FROM "Series"')}
+		connection.close()
+
+	def _checkMigration(self, processes):
+		result = migrateDatabase(self.filename, chunksize = 5, processes = processes)
+		assert result['rows'] == result['converted'] == len(self.strvalues)
+		assert result['definitions'] == 2
+
+		connection = sqlite3.connect(self.filename)
+		columns = ['region', 'report', 'code', 'binvalues', 'strvalues'] + utilities.encoding.SUMMARY_KEYS
+		rows = connection.execute('SELECT {} FROM "Series"'.format(', '.join('"{}"'.format(i) for i in columns))).fetchall()
+		assert len(rows) == len(self.strvalues)
+		for row in rows:
+			_, expected_years, expected_values = utilities.encoding.decodeStringValues([self.strvalues[row[:3]]])
+			years, values = utilities.encoding.unpackValues(row[3])
+			assert years.tolist() == expected_years.tolist()
+			assert values.tolist() == expected_values.tolist()
+			assert row[4] == ''
+
+			summary = utilities.encoding.summarizeValues(years, values)
+			assert list(row[5:]) == [summary[i] for i in utilities.encoding.SUMMARY_KEYS]
+
+		definitions = connection.execute('SELECT "code", "name", "description", "notes" FROM "SeriesDefinition" ORDER BY "code"').fetchall()
+		assert definitions == [
+			('LP', 'Series LP', 'Description of region 0', 'Notes on LP'),
+			('NGDP', 'Series NGDP', 'Description of region 0', 'Notes on NGDP')
+		]
+		# Every series has the same name as its definition, so none is saved with the series.
+		assert connection.execute('SELECT COUNT(*) FROM "Series" WHERE "name" != \'\'').fetchone()[0] == 0
+		connection.close()
+
+		database = RegionDatabase(self.filename)
+		with db_session:
+			series = database.getSeries('R01', 'LP')
+			assert series.name == 'Series LP'
+			assert series.description == 'Description of LP'
+			assert series.notes == 'Notes on LP'
+			assert series.arrays[0].tolist() == list(range(2000, 2006))
+		assert database.search('NGDP', kind = 'series')[0]['code'] == 'NGDP'
+
+	@staticmethod
+	def _readExport(filename):
+		with open(filename) as file1:
+			return sorted((json.loads(line) for line in file1), key = lambda i: (i['region'], i['code']))
+
+	def testExportBaseline(self):
+		# Databases that have not been migrated are exported from 'strvalues'.
+		folder = os.path.dirname(self.filename)
+		result = exportDatabase(self.filename, os.path.join(folder, 'baseline.ndjson'))
+		assert result['series'] == len(self.strvalues)
+		lines = self._readExport(os.path.join(folder, 'baseline.ndjson'))
+		assert lines[0]['name'] == 'Series LP'
+		assert lines[0]['values'][0] == [2000, 2000 / 8 + 2]
+
+		migrateDatabase(self.filename)
+		exportDatabase(self.filename, os.path.join(folder, 'migrated.ndjson'))
+		assert self._readExport(os.path.join(folder, 'migrated.ndjson')) == lines
+
+	def testSnapshotBaseline(self):
+		folder = os.path.dirname(self.filename)
+		snapshot = RegionSnapshot(compileSnapshot(self.filename, os.path.join(folder, 'baseline.snapshot')))
+		series = snapshot.getSeries('R01', 'LP', report = 'Test Report')
+		assert series.name == 'Series LP'
+		assert series.values.tolist() == [1 + year / 8 + 2 for year in range(2000, 2006)]
+
+		migrateDatabase(self.filename)
+		migrated = RegionSnapshot(compileSnapshot(self.filename, os.path.join(folder, 'migrated.snapshot')))
+		assert snapshot.getPanel('Test Report', 'LP').equals(migrated.getPanel('Test Report', 'LP'))
+
+	def testMigrate(self):
+		self._checkMigration(processes = 1)
+
+	def testMigrateInParallel(self):
+		self._checkMigration(processes = 2)
+
+	def testResumeMigration(self):
+		migration = sys.modules[migrateDatabase.__module__]
+		read_chunk = migration._readChunk
+		migration._readChunk = failAfter(read_chunk, 1)
+		try:
+			with self.assertRaises(RuntimeError):
+				migrateDatabase(self.filename, chunksize = 5, processes = 1)
+		finally:
+			migration._readChunk = read_chunk
+
+		connection = sqlite3.connect(self.filename)
+		assert connection.execute('SELECT "position" FROM "MigrationCheckpoint"').fetchall() == [(5,)]
+		assert connection.execute('SELECT COUNT(*) FROM "Series" WHERE "binvalues" IS NOT NULL').fetchone()[0] == 5
+		connection.close()
+
+		result = migrateDatabase(self.filename, chunksize = 5, processes = 1)
+		assert result['rows'] == result['converted'] == len(self.strvalues) - 5
+
+		connection = sqlite3.connect(self.filename)
+		assert connection.execute('SELECT COUNT(*) FROM "Series" WHERE "binvalues" IS NULL OR "strvalues" != \'\'').fetchone()[0] == 0
+		assert connection.execute('SELECT COUNT(*) FROM "MigrationCheckpoint"').fetchone()[0] == 0
+		connection.close()
+
+
+class TestImport(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+
+	@staticmethod
+	def _readTables(database, tables = ('Series', 'SeriesDefinition', 'Region', 'Identifier', 'Scale', 'Unit')):
+		""" Returns the rows of each table, sorted, keyed by table name. """
+		connection = sqlite3.connect(database.filename)
+		result = {i: sorted(connection.execute('SELECT * FROM "{}"'.format(i)).fetchall(), key = repr) for i in tables}
+		connection.close()
+		return result
+
+	def _checkSeriesNames(self, **kwargs):
+		report = makeReport()
+		report['regions'][1]['regionSeries'][0]['seriesName'] = 'Local Name'
+		database = createDatabase(os.path.join(tempfile.mkdtemp(), 'names.sqlite'))
+		database.addFromApi(report, verbose = False, **kwargs)
+
+		# Names are only saved with a series when they differ from the series definition.
+		connection = sqlite3.connect(database.filename)
+		names = connection.execute('SELECT "region", "code", "name" FROM "Series" WHERE "name" != \'\'').fetchall()
+		connection.close()
+		assert names == [('R01', 'LP', 'Local Name')]
+
+		with db_session:
+			assert database.getSeries('R01', 'LP').name == 'Local Name'
+			assert database.getSeries('R02', 'LP').name == 'Series LP'
+			assert database.getSeries('R02', 'LP').toDict(True)['seriesName'] == 'Series LP'
+			assert [i['seriesName'] for i in database.serialize([database.getSeries('R01', 'LP'), database.getSeries('R02', 'LP')])] == [
+				'Local Name', 'Series LP'
+			]
+			assert database.getRegion('R01').getSeries('Local Name').code == 'LP'
+			assert database.getRegion('R02').getSeries('Series LP').code == 'LP'
+			assert database.getRegion('R01').getSeries('Series LP') is None
+
+	def testSeriesNames(self):
+		self._checkSeriesNames()
+
+	def testBulkSeriesNames(self):
+		self._checkSeriesNames(bulk = True, batch_size = 5)
+
+	def testBulkImport(self):
+		database = createDatabase(os.path.join(self.folder, 'orm.sqlite'))
+		database.addFromApi(makeReport(), verbose = False, batch_size = 5)
+		bulk_database = createDatabase(os.path.join(self.folder, 'bulk.sqlite'))
+		bulk_database.addFromApi(makeReport(), verbose = False, bulk = True, batch_size = 5)
+
+		tables = self._readTables(database)
+		assert len(tables['Series']) == 12
+		assert self._readTables(bulk_database) == tables
+
+	def _checkResume(self, method, import_method, makeArgument, calls = 1, **kwargs):
+		""" Interrupts an import once `method` has been called `calls` times, resumes it, and
+			compares the result to an uninterrupted import.
+		"""
+		database = createDatabase(os.path.join(self.folder, 'complete.sqlite'))
+		getattr(database, import_method)(makeArgument(), **kwargs)
+
+		interrupted_database = createDatabase(os.path.join(self.folder, 'interrupted.sqlite'))
+		setattr(interrupted_database, method, failAfter(getattr(interrupted_database, method), calls))
+		with self.assertRaises(RuntimeError):
+			getattr(interrupted_database, import_method)(makeArgument(), **kwargs)
+		delattr(interrupted_database, method)
+
+		checkpoints = self._readTables(interrupted_database, ['ImportCheckpoint'])['ImportCheckpoint']
+		assert len(checkpoints) == 1 and checkpoints[0][1] > 0
+		series = self._readTables(interrupted_database, ['Series'])['Series']
+		assert 0 < len(series) < 12
+
+		getattr(interrupted_database, import_method)(makeArgument(), **kwargs)
+		tables = self._readTables(interrupted_database, ['Series', 'SeriesDefinition', 'Region', 'Identifier', 'ImportCheckpoint'])
+		assert tables == self._readTables(database, ['Series', 'SeriesDefinition', 'Region', 'Identifier', 'ImportCheckpoint'])
+		assert len(tables['Series']) == 12
+		assert tables['ImportCheckpoint'] == []
+
+	@staticmethod
+	def _readIndexes(database):
+		connection = sqlite3.connect(database.filename)
+		indexes = connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' ORDER BY name").fetchall()
+		connection.close()
+		return indexes
+
+	def testDeferIndexes(self):
+		database = createDatabase(os.path.join(self.folder, 'deferred.sqlite'))
+		indexes = self._readIndexes(database)
+		assert len([i for i in indexes if i[1] is not None]) > 0
+
+		timings = database.addReport(makeImport(), 'TST', defer_indexes = True, batch_size = 5)
+		assert set(timings) == {'dropIndexes', 'load', 'createIndexes', 'analyze'}
+		# The import also adds the index of the checkpoint table's primary key.
+		imported_indexes = self._readIndexes(database)
+		assert set(indexes) < set(imported_indexes)
+
+		# The indexes are rebuilt when the import fails.
+		database._addReportSeries = failAfter(database._addReportSeries, 0)
+		with self.assertRaises(RuntimeError):
+			database.addReport(makeImport(name = 'Other Report'), 'TST', defer_indexes = True)
+		assert self._readIndexes(database) == imported_indexes
+
+	def testResumeReport(self):
+		self._checkResume('_addReportSeries', 'addReport', makeImport, namespace = 'TST', batch_size = 5)
+
+	def testResumeApiImport(self):
+		self._checkResume('_addApiRegions', 'addFromApi', makeReport, verbose = False, batch_size = 5)
+
+	def testResumeBulkImport(self):
+		# The first call records the start of the import, the second the first batch.
+		self._checkResume('_setImportCheckpoint', 'addFromApi', makeReport, calls = 2, verbose = False, bulk = True, batch_size = 5)
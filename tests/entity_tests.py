@@ -1,9 +1,12 @@
 
+import math
 import unittest
+import numpy
 
 from pony.orm import db_session
 
-from common import DATASET, TEST_REGION, TEST_SERIES, TEST_REPORT, TEST_IDENTIFIER, TEST_AGENCY, TEST_UNIT, TEST_SCALE
+from common import DataSeries, DATASET, TEST_REGION, TEST_SERIES, TEST_REPORT, TEST_IDENTIFIER, TEST_AGENCY, TEST_UNIT, TEST_SCALE
+from pytools import timetools
 
 subject_code = 'LP'
 database = DATASET
@@ -39,7 +42,11 @@ class VerifyEntityData(unittest.TestCase):
 		assert self.series.report.name == TEST_SERIES['report']
 		assert self.series.scale.string == TEST_SERIES['scale']
 		assert self.series.unit.string == TEST_SERIES['unit']
-		assert self.series.strvalues == TEST_SERIES['strvalues']
+		if self.series.binvalues:
+			expected_values = [tuple(float(j) for j in i.split('|')) for i in TEST_SERIES['strvalues'].split('||')]
+			assert self.series.fvalues == expected_values
+		else:
+			assert self.series.strvalues == TEST_SERIES['strvalues']
 
 		assert all([i==j] for i, j in zip(self.series.values, TEST_SERIES['values']))
 
@@ -83,3 +90,46 @@ class VerifyEntityData(unittest.TestCase):
 		scale = self.series.scale 
 		assert scale.multiplier == TEST_SCALE['multiplier']
 		assert scale.string == TEST_SCALE['string']
+
+	@db_session
+	def testDataSeries(self):
+		data_series = DataSeries(database.serialize([database.getSeries('USA', subject_code)])[0])
+		years, values = data_series.arrays
+
+		assert data_series.ix == [int(i) for i in years]
+		assert data_series.getValue(data_series.ix[0]) == values[0]
+		assert len(data_series.series) == len(values)
+
+	@db_session
+	def testDataSeriesYearValues(self):
+		data_series = DataSeries(database.serialize([database.getSeries('USA', subject_code)])[0])
+		years = data_series.ix + [min(data_series.ix) - 10, max(data_series.ix) + 10]
+
+		for method in ['interpolate', 'inner', 'exact']:
+			expected = [data_series.getValue(i, method = method) for i in years]
+			result = data_series.getYearValues(years, method = method)
+			assert numpy.allclose(result, expected, equal_nan = True)
+
+
+class TestDataSeries(unittest.TestCase):
+	def testYearValuesWithMissingValues(self):
+		values = [1.0, math.nan, 3.0, math.nan, 5.0]
+		data = {
+			'seriesRegion':  {'regionName': 'Region', 'regionType': 'country', 'entityKey': 'Region'},
+			'seriesReport':  {'reportName': 'Report'},
+			'seriesScale':   {'scaleMultiplier': 2.0},
+			'seriesCode':    'LP',
+			'seriesValues':  [(timetools.Timestamp('{}-01-01'.format(2000 + i)), j) for i, j in enumerate(values)]
+		}
+		data_series = DataSeries(data)
+		years = [1990, 2000, 2001, 2002.5, 2003, 2010]
+
+		for method in ['interpolate', 'inner', 'exact']:
+			expected = [data_series.getValue(i, method = method) for i in years]
+			result = data_series.getYearValues(years, method = method)
+			assert numpy.allclose(result, expected, equal_nan = True)
+
+		assert data_series.getValue(2001) == 4.0
+		assert math.isnan(data_series.getValue(2003, method = 'exact'))
+		assert data_series.getValue(1990) == 2.0
+		assert math.isnan(data_series.getValue(1990, method = 'inner'))
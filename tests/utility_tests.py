@@ -0,0 +1,219 @@
+import unittest
+import math
+import os
+import numpy
+import pandas
+
+from common import utilities
+
+encoding = utilities.encoding
+
+class TestValueEncoding(unittest.TestCase):
+
+	def testToYear(self):
+		assert encoding.toYear(2017) == 2017
+		assert encoding.toYear(2017.0) == 2017
+		assert encoding.toYear('2017') == 2017
+		assert encoding.toYear('2017-01-01') == 2017
+		assert encoding.toYear('2017-01-01T00:00:00') == 2017
+		assert encoding.toYear('2017-03-21') is None
+		assert encoding.toYear(2017.5) is None
+
+	def testPackValues(self):
+		values = [(1980, 227.622), ('1981-01-01', 229.916), (1982.0, math.nan)]
+		buffer = encoding.packValues(values)
+
+		assert len(buffer) == len(values) * encoding.POINT_SIZE
+
+		years, series_values = encoding.unpackValues(buffer)
+		assert years.tolist() == [1980, 1981, 1982]
+		assert series_values.tolist()[:2] == [227.622, 229.916]
+		assert math.isnan(series_values[2])
+
+	def testPackInvalidValues(self):
+		assert encoding.packValues([]) is None
+		assert encoding.packValues([('2017-03-21', 1.0)]) is None
+
+	def testUnpackInvalidBuffer(self):
+		with self.assertRaises(ValueError):
+			encoding.unpackValues(b'\x00' * (encoding.POINT_SIZE + 1))
+
+	def testDecodeStringValues(self):
+		strings = ['1980|1.5||1981|-2.5e3', '', '2017-01-01|3.0']
+		offsets, years, values = encoding.decodeStringValues(strings)
+
+		assert offsets.tolist() == [0, 2, 2, 3]
+		assert years.tolist() == [1980, 1981, 2017]
+		assert values.tolist() == [1.5, -2500.0, 3.0]
+
+	def testDecodeStringValuesStrict(self):
+		with self.assertRaises(ValueError):
+			encoding.decodeStringValues(['2017-03-21|1.0'], strict = True)
+
+	def testDecodeMixedValues(self):
+		buffer = encoding.packValues([(2000, 1.0), (2001, 2.0)])
+		offsets, years, values = encoding.decodeValues([(buffer, ''), (None, '1990|3.0')])
+
+		assert offsets.tolist() == [0, 2, 3]
+		assert years.tolist() == [2000, 2001, 1990]
+		assert values.tolist() == [1.0, 2.0, 3.0]
+
+	def testSummarizeValues(self):
+		years = numpy.array([2000, 2001, 2002])
+		summary = encoding.summarizeValues(years, numpy.array([2.0, -1.0, math.nan]))
+
+		assert (summary['firstyear'], summary['lastyear'], summary['points']) == (2000, 2001, 2)
+		assert (summary['minimum'], summary['maximum'], summary['latest']) == (-1.0, 2.0, -1.0)
+		assert summary['checksum'] != encoding.summarizeValues(years, numpy.zeros(3))['checksum']
+
+
+class TestValueCache(unittest.TestCase):
+
+	def testEviction(self):
+		value_cache = utilities.cache.ValueCache(max_bytes = 3 * (60 + utilities.cache.ENTRY_OVERHEAD))
+		arrays = (numpy.zeros(5, dtype = numpy.int32), numpy.zeros(5))
+		for code in ['A', 'B', 'C']:
+			value_cache.put(('test', 'USA', 'WEO', code), arrays)
+
+		assert value_cache.get(('test', 'USA', 'WEO', 'A')) is not None
+		value_cache.put(('test', 'USA', 'WEO', 'D'), arrays)
+
+		assert ('test', 'USA', 'WEO', 'B') not in value_cache
+		assert ('test', 'USA', 'WEO', 'A') in value_cache
+		assert value_cache.stats['evictions'] == 1
+		assert value_cache.stats['hits'] == 1
+
+	def testInvalidate(self):
+		value_cache = utilities.cache.ValueCache()
+		arrays = (numpy.zeros(5, dtype = numpy.int32), numpy.zeros(5))
+		value_cache.put(('test', 'USA', 'WEO', 'LP'), arrays)
+		value_cache.put(('test', 'USA', 'WDI', 'LP'), arrays)
+
+		assert value_cache.invalidate('test', 'WEO') == 1
+		assert value_cache.get(('test', 'USA', 'WEO', 'LP')) is None
+		assert value_cache.get(('test', 'USA', 'WDI', 'LP')) is not None
+		assert value_cache.size == len(value_cache) * (60 + utilities.cache.ENTRY_OVERHEAD)
+
+
+class TestTableCache(unittest.TestCase):
+
+	def testSaveFrame(self):
+		import tempfile
+		frame = pandas.DataFrame({
+			'regionCode': ['USA', 'CAN', None],
+			'1990':       [1.5, math.nan, 3.0],
+			'notes':      ['a', 1, None]
+		})
+		with tempfile.TemporaryDirectory() as folder:
+			utilities.table_cache._saveFrame(frame, folder)
+			result = utilities.table_cache._loadFrame(folder)
+
+			assert result.columns.tolist() == frame.columns.tolist()
+			assert result['regionCode'].tolist()[:2] == ['USA', 'CAN']
+			assert pandas.isnull(result['regionCode'].iloc[2])
+			assert numpy.array_equal(result['1990'].values, frame['1990'].values, equal_nan = True)
+			assert result['notes'].tolist()[:2] == ['a', 1]
+
+	def testReadSheet(self):
+		import tempfile
+		with tempfile.TemporaryDirectory() as folder:
+			filename = os.path.join(folder, 'workbook.xlsx')
+			cache_folder = os.path.join(folder, 'cache')
+			with pandas.ExcelWriter(filename) as writer:
+				pandas.DataFrame({'regionCode': ['USA'], '1990': [1.5]}).to_excel(writer, sheet_name = 'First', index = False)
+				pandas.DataFrame({'regionCode': ['CAN', 'MEX'], '1990': [2.5, 3.5]}).to_excel(writer, sheet_name = 'Second', index = False)
+
+			table = utilities.table_cache.readTable(filename, use_cache = True, cache_folder = cache_folder, sheetname = 'Second')
+			assert len(table) == 2
+			assert [row['regionCode'] for row in table] == ['CAN', 'MEX']
+
+			# Both spellings of the sheet argument share the cached sheet.
+			assert len(os.listdir(cache_folder)) == 1
+			frame = utilities.table_cache.readFrame(filename, cache_folder = cache_folder, sheet_name = 'Second')
+			assert frame['1990'].tolist() == [2.5, 3.5]
+			assert len(os.listdir(cache_folder)) == 1
+
+
+class TestTableApi(unittest.TestCase):
+
+	@staticmethod
+	def _makeTable(regions = 4):
+		""" A table with two series per region, some blank cells and a year column of text. """
+		rows = list()
+		for index in range(regions):
+			for code in ['A', 'B']:
+				row = {
+					'regionCode':        'R{:02}'.format(index),
+					'regionName':        'Region {}'.format(index),
+					'seriesCode':        code,
+					'seriesName':        'Series ' + code,
+					'seriesDescription': 'Description of ' + code,
+					'notes':             'Notes on ' + code,
+					'seriesTags':        'tag',
+					'units':             'Persons',
+					'scale':             'Millions'
+				}
+				row.update({year: index + year / 8 for year in range(2000, 2004)})
+				rows.append(row)
+		table = pandas.DataFrame(rows)
+		table.loc[1, 2001] = math.nan
+		table.loc[2, 2002] = math.nan
+		table['2004'] = ['1.5', '', 'n/a', None, 3, '1,234', ' 2.5 ', math.nan][:len(table)] + ['4'] * (len(table) - 8)
+		return table
+
+	@staticmethod
+	def _getArguments(**kwargs):
+		arguments = {
+			'namespace':      'TST',
+			'report':         {'reportName': 'Test Report', 'reportCode': 'TR', 'reportDate': '2017', 'reportUrl': 'http://www.example.com/report'},
+			'agency':         {'agencyName': 'Test Agency', 'agencyCode': 'TA', 'agencyAddress': 'Address', 'agencyUrl': 'http://www.example.com'},
+			'jsonCompatible': True
+		}
+		arguments.update(kwargs)
+		return arguments
+
+	def testTableValues(self):
+		table = self._makeTable()
+		year_columns, _ = utilities.tables.separateTableColumns(table.columns)
+		x_values = utilities.TableApi._getXValues(year_columns, '01-01', True)
+		table_values = utilities.TableApi._getTableValues(table, year_columns, x_values)
+
+		# Matches reading each row one cell at a time.
+		assert table_values == [utilities.TableApi._getValues(row, '01-01', True) for _, row in table.iterrows()]
+		assert [i for i, _ in table_values[0]] == ['2000-01-01', '2001-01-01', '2002-01-01', '2003-01-01', '2004-01-01']
+		assert '2001-01-01' not in [i for i, _ in table_values[1]]
+		assert table_values[0][-1] == ('2004-01-01', 1.5)
+		assert table_values[4][-1] == ('2004-01-01', 3.0)
+
+	def testStream(self):
+		table_api = utilities.TableApi(self._makeTable(), **self._getArguments())
+		streamed = utilities.TableApi(self._makeTable(), **self._getArguments(stream = True))
+
+		assert isinstance(streamed.data['regions'], utilities.ValidatedRegions)
+		assert list(streamed.data['regions']) == table_api.data['regions']
+		assert len(table_api.data['regions']) == 4
+
+		with self.assertRaises(ValueError):
+			utilities.TableApi(self._makeTable(), **self._getArguments(stream = True, saveTo = 'regions.json'))
+
+		# Streamed regions are only validated as they are read.
+		response = dict(table_api.data, regions = iter([{'regionName': 'Region 0'}]))
+		utilities.ValidateApiResponse(response)
+		with self.assertRaises(KeyError):
+			list(response['regions'])
+
+	def testParallelParse(self):
+		table_api = utilities.TableApi(self._makeTable(), **self._getArguments())
+		parallel = utilities.TableApi(self._makeTable(), **self._getArguments(processes = 2))
+
+		assert [i['regionCode'] for i in parallel.data['regions']] == ['R00', 'R01', 'R02', 'R03']
+		assert parallel.data['regions'] == table_api.data['regions']
+
+		# The notes of each series are looked up by 'regionCode|seriesCode', which fails for a numeric code.
+		table = self._makeTable()
+		table['seriesCode'] = table['seriesCode'].astype(object)
+		table.loc[5, 'seriesCode'] = 5
+		with self.assertRaises(utilities.RegionParseError) as context:
+			utilities.TableApi(table, **self._getArguments(processes = 2, seriesNoteMap = {'R00|A': 'Notes on A'}))
+		assert context.exception.region_code == 'R02'
+		assert context.exception.exception_type == 'TypeError'